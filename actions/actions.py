@@ -1,8 +1,22 @@
 from typing import Any, Text, Dict, List
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
+import asyncio
 import requests
 import sqlite3
+import uuid
+
+CHAT_ATTEMPTS = 3
+# /chat answers these with a "coba lagi" message and Retry-After: busy user
+# lock (409), rate limit (429) or load shedding (503)
+CHAT_RETRY_STATUSES = (409, 429, 503)
+CHAT_MAX_RETRY_WAIT = 5  # seconds
+
+def retry_after_seconds(response):
+    try:
+        return min(max(int(response.headers.get('Retry-After', 1)), 0), CHAT_MAX_RETRY_WAIT)
+    except ValueError:
+        return 1
 
 class ActionHandleChatbot(Action):
     def name(self) -> Text:
@@ -16,18 +30,34 @@ class ActionHandleChatbot(Action):
     ) -> List[Dict[Text, Any]]:
         user_message = tracker.latest_message.get('text', '')
         user_id = tracker.sender_id
+        # Same key on every attempt, so /chat replays instead of re-running
+        # a step (e.g. a second booking on a retried 'konfirmasi').
+        idempotency_key = tracker.latest_message.get('message_id') or str(uuid.uuid4())
 
-        try:
-            response = requests.post(
-                'http://localhost:5000/chat',
-                json={'message': user_message, 'user_id': user_id},
-                timeout=5
-            )
-            response.raise_for_status()
-            data = response.json()
-            dispatcher.utter_message(text=data.get('response', 'Maaf, terjadi kesalahan.'))
-        except requests.RequestException as e:
-            dispatcher.utter_message(text=f"Maaf, ada masalah dengan server: {str(e)}")
+        for attempt in range(CHAT_ATTEMPTS):
+            try:
+                response = requests.post(
+                    'http://localhost:5000/chat',
+                    json={'message': user_message, 'user_id': user_id},
+                    headers={'Idempotency-Key': idempotency_key},
+                    timeout=5
+                )
+                if response.status_code in CHAT_RETRY_STATUSES:
+                    if attempt < CHAT_ATTEMPTS - 1:
+                        # Same key on the retry, so a finished attempt is replayed
+                        await asyncio.sleep(retry_after_seconds(response))
+                        continue
+                else:
+                    response.raise_for_status()
+                data = response.json()
+                dispatcher.utter_message(text=data.get('response', 'Maaf, terjadi kesalahan.'))
+                break
+            except (requests.Timeout, requests.ConnectionError) as e:
+                if attempt == CHAT_ATTEMPTS - 1:
+                    dispatcher.utter_message(text=f"Maaf, ada masalah dengan server: {str(e)}")
+            except requests.RequestException as e:
+                dispatcher.utter_message(text=f"Maaf, ada masalah dengan server: {str(e)}")
+                break
 
         return []
     
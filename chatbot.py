@@ -1,12 +1,26 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, make_response, stream_with_context
 from flask_cors import CORS
-import pandas as pd
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
+import queue
 import re
 from datetime import datetime
 import sqlite3
 import uuid
+import json
 import logging
+from functools import wraps
+
+from database.apply_schema import migrate
+from database.queries import (LIST_RESERVATIONS, REPORT_STATUS_TOTALS, RESERVATION_BY_PNR, reservation_columns,
+                              reservation_records, summarize_status_totals)
+from idempotency import IdempotencyCache, KeyedLocks
+from llm_serving import LlamaService, load_backend
+from profiling import RequestProfiler
+from rate_limit import LoadShedder, MemoryBucketStore, RateLimiter, SQLiteBucketStore
+from reservations_export import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, iter_reservation_chunks, parse_statuses, stream_export
+from rf_model import ModelCache, build_features, parse_model_paths
+from serialization import fast_jsonify
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": ["http://192.168.0.9:3000", "http://localhost:3000", "http://192.168.18.175:3000"]}})
@@ -19,9 +33,87 @@ DB_PATH = os.path.join(BASE_DIR, 'database', 'reservations.db')
 logging.basicConfig(level=logging.INFO, filename='chatbot.log', filemode='a',
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Gunicorn imports the app without running __main__, so bring the schema up
+# to date here; this also switches the file to WAL, which the read-only
+# reporting connections need to avoid blocking booking commits.
+try:
+    migrate(DB_PATH)
+except sqlite3.Error as e:
+    logging.error(f"Could not migrate {DB_PATH}: {e}")
+
 # Initialize user states
 user_states = {}
 
+# Rate limiting and load shedding for /chat. Set CHAT_RATE_LIMIT_STORE=sqlite
+# to share buckets between worker processes through CHAT_RATE_LIMIT_DB.
+CHAT_USER_RATE = float(os.environ.get('CHAT_USER_RATE', 1.0))  # requests per second
+CHAT_USER_BURST = int(os.environ.get('CHAT_USER_BURST', 30))
+CHAT_IP_RATE = float(os.environ.get('CHAT_IP_RATE', 10.0))
+CHAT_IP_BURST = int(os.environ.get('CHAT_IP_BURST', 100))
+# Client addresses exempt from the per-IP bucket. Set this to the Rasa action
+# server's address (e.g. CHAT_TRUSTED_IPS=127.0.0.1 when Rasa runs on this
+# host), since it calls /chat for every user. Empty by default: behind a
+# same-host reverse proxy every request would otherwise come from 127.0.0.1.
+CHAT_TRUSTED_IPS = set(filter(None, os.environ.get('CHAT_TRUSTED_IPS', '').split(',')))
+# Number of reverse proxies in front of the app. When set, the client address
+# is taken from X-Forwarded-For as appended by those proxies.
+CHAT_PROXY_HOPS = int(os.environ.get('CHAT_PROXY_HOPS', 0))
+if CHAT_PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=CHAT_PROXY_HOPS)
+CHAT_MAX_IN_FLIGHT = int(os.environ.get('CHAT_MAX_IN_FLIGHT', 32))
+
+if os.environ.get('CHAT_RATE_LIMIT_STORE', 'memory') == 'sqlite':
+    rate_limit_store = SQLiteBucketStore(os.environ.get('CHAT_RATE_LIMIT_DB', os.path.join(BASE_DIR, 'database', 'rate_limits.db')))
+else:
+    rate_limit_store = MemoryBucketStore()
+user_rate_limiter = RateLimiter(rate_limit_store, CHAT_USER_RATE, CHAT_USER_BURST)
+ip_rate_limiter = RateLimiter(rate_limit_store, CHAT_IP_RATE, CHAT_IP_BURST)
+chat_load_shedder = LoadShedder(CHAT_MAX_IN_FLIGHT)
+
+# Fresh PNRs to try when a generated one is already taken
+PNR_ATTEMPTS = 5
+
+# Serializes /chat requests per user_id. A request waits at most
+# CHAT_USER_LOCK_WAIT seconds for the same user's previous one before it is
+# turned away, so queued duplicates do not hold load-shedder slots.
+CHAT_USER_LOCK_WAIT = float(os.environ.get('CHAT_USER_LOCK_WAIT', 0.5))
+user_locks = KeyedLocks()
+
+# Responses to /chat requests carrying an Idempotency-Key header (or a
+# request_id field), replayed when Rasa or the gateway retries them.
+CHAT_IDEMPOTENCY_TTL = float(os.environ.get('CHAT_IDEMPOTENCY_TTL', 600))
+CHAT_IDEMPOTENCY_MAX_ENTRIES = int(os.environ.get('CHAT_IDEMPOTENCY_MAX_ENTRIES', 10000))
+CHAT_IDEMPOTENCY_WAIT = 10.0  # seconds a retry waits for the original attempt
+chat_responses = IdempotencyCache(CHAT_IDEMPOTENCY_MAX_ENTRIES, CHAT_IDEMPOTENCY_TTL)
+
+# Model serving for /llama/respond. LLAMA_BACKEND is 'fake' (deterministic
+# echo) or a 'module:ClassName' path to a backend with generate_batch().
+LLAMA_MAX_BATCH_SIZE = int(os.environ.get('LLAMA_MAX_BATCH_SIZE', 8))
+LLAMA_MAX_WAIT = float(os.environ.get('LLAMA_MAX_WAIT_MS', 10)) / 1000
+LLAMA_CACHE_SIZE = int(os.environ.get('LLAMA_CACHE_SIZE', 1024))
+LLAMA_MAX_TOKENS = int(os.environ.get('LLAMA_MAX_TOKENS', 256))
+LLAMA_TIMEOUT = 60.0  # seconds to wait for the next token
+llama_service = LlamaService(load_backend(os.environ.get('LLAMA_BACKEND', 'fake')),
+                             LLAMA_MAX_BATCH_SIZE, LLAMA_MAX_WAIT, LLAMA_CACHE_SIZE)
+
+# Random-forest models for /rf/predict, loaded once per worker. RF_MODELS maps
+# names to files ('noshow=models/noshow.joblib,demand=models/demand.joblib').
+RF_MODELS = parse_model_paths(os.environ.get('RF_MODELS', 'default=models/random_forest.joblib'), BASE_DIR)
+RF_MODEL_HOT_RELOAD = os.environ.get('RF_MODEL_HOT_RELOAD', '0') == '1'
+RF_MAX_BATCH_ROWS = int(os.environ.get('RF_MAX_BATCH_ROWS', 10000))
+rf_models = {name: ModelCache(path, RF_MODEL_HOT_RELOAD) for name, path in RF_MODELS.items()}
+
+# Opt-in profiling; with the defaults no request hooks are installed.
+# PROFILE_MODE is 'off', 'cprofile' or 'sample'; PROFILE_SLOW_MS > 0 captures
+# stacks of slow requests. /admin/profiles needs PROFILE_ADMIN_TOKEN.
+request_profiler = RequestProfiler(
+    mode=os.environ.get('PROFILE_MODE', 'off'),
+    sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', 0.01)),
+    slow_ms=float(os.environ.get('PROFILE_SLOW_MS', 0)),
+    admin_token=os.environ.get('PROFILE_ADMIN_TOKEN'),
+)
+request_profiler.init_app(app)
+
 # Pricing logic updated to match client request in hcd_enchance.txt
 
 # Base prices and additional charges for Reguler service
@@ -143,19 +235,61 @@ def calculate_price(service, route, passengers, addresses=1, vehicle_type=None,
 def llama_respond():
     data = request.json
     prompt = data.get('prompt', '')
-    # Here you would call your Llama Maverick model or API
-    # For demo, just echo the prompt
-    answer = f"Llama Maverick response for: {prompt}"
+    try:
+        max_tokens = int(data.get('max_tokens', LLAMA_MAX_TOKENS))
+    except (TypeError, ValueError):
+        max_tokens = 0
+    if max_tokens < 1:
+        return jsonify({'error': 'max_tokens must be a positive integer'}), 400
+    max_tokens = min(max_tokens, LLAMA_MAX_TOKENS)
+    if data.get('stream'):
+        def events():
+            try:
+                for token in llama_service.stream(prompt, max_tokens, LLAMA_TIMEOUT):
+                    yield f"data: {json.dumps({'token': token})}\n\n"
+            except queue.Empty:
+                yield f"event: error\ndata: {json.dumps({'error': 'Model timed out'})}\n\n"
+                return
+            except Exception as e:
+                logging.error(f"Llama backend failed: {e}")
+                yield f"event: error\ndata: {json.dumps({'error': 'Model unavailable'})}\n\n"
+                return
+            yield "event: done\ndata: {}\n\n"
+        return Response(stream_with_context(events()), mimetype='text/event-stream')
+    try:
+        answer = llama_service.respond(prompt, max_tokens, LLAMA_TIMEOUT)
+    except queue.Empty:
+        return jsonify({'error': 'Model timed out'}), 504
+    except Exception as e:
+        logging.error(f"Llama backend failed: {e}")
+        return jsonify({'error': 'Model unavailable'}), 503
     return jsonify({"answer": answer})
 
 # --- Random Forest endpoint ---
 @app.route('/rf/predict', methods=['POST'])
 def rf_predict():
     data = request.json
-    # Example: Use features from data to predict
-    # For demo, just echo the input
-    prediction = f"RF prediction for input: {data}"
-    return jsonify({"prediction": prediction})
+    model = rf_models.get(data.get('model', 'default'))
+    if model is None:
+        return jsonify({'error': f"Unknown model: {data.get('model')}", 'models': sorted(rf_models)}), 404
+    # Either a batch {"rows": [...]} or a single record as before
+    rows = data.get('rows')
+    single = rows is None
+    if single:
+        rows = [data.get('features', data)]
+    if not isinstance(rows, list) or len(rows) > RF_MAX_BATCH_ROWS:
+        return jsonify({'error': f'rows must be a list of at most {RF_MAX_BATCH_ROWS} records'}), 400
+    try:
+        scores = model.predict(build_features(rows)).tolist()
+    except FileNotFoundError:
+        return jsonify({'error': f'Model file not found: {model.path}'}), 503
+    except ImportError as e:
+        return jsonify({'error': f'Model scoring unavailable: {e}'}), 503
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid feature rows: {e}'}), 400
+    if single:
+        return jsonify({'prediction': scores[0]})
+    return fast_jsonify({'predictions': scores})
 
 def process_input(message):
     message_lower = message.lower()
@@ -186,7 +320,84 @@ def calculate_cost(service, route, passengers, addresses=1, vehicle_type=None, r
     }
     return total, details
 
+def confirmation_message(booking_data):
+    return (
+        f"Pemesanan dikonfirmasi untuk {booking_data['name']}:\n"
+        f"Kode Booking: {booking_data['pnr']}\n"
+        f"Apa yang ingin dilakukan selanjutnya? Ketik: 'selesai', 'buatkan reservasi lagi', atau 'cari pesanan'."
+    )
+
+def try_again_later(retry_after, status):
+    response = jsonify({'response': 'Maaf, server sedang sibuk. Silakan coba lagi dalam beberapa detik.'})
+    response.status_code = status
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def guard_chat(view):
+    @wraps(view)
+    def guarded(*args, **kwargs):
+        user_id = (request.get_json(silent=True) or {}).get('user_id', 'default_user')
+        client_ip = request.remote_addr or ''
+        try:
+            allowed, retry_after = user_rate_limiter.check(f'user:{user_id}')
+            if allowed and client_ip not in CHAT_TRUSTED_IPS:
+                allowed, retry_after = ip_rate_limiter.check(f'ip:{client_ip}')
+        except sqlite3.Error as e:
+            # A busy shared store must not take /chat down with it
+            logging.warning(f"Rate limit store unavailable, allowing request: {e}")
+            allowed, retry_after = True, 0
+        if not allowed:
+            logging.info(f"Rate limited user {user_id} from {client_ip}")
+            return try_again_later(retry_after, 429)
+        # One request per user at a time, so a retry racing the original
+        # cannot run the same booking step twice.
+        if not user_locks.acquire(user_id, timeout=CHAT_USER_LOCK_WAIT):
+            return try_again_later(1, 409)
+        try:
+            if not chat_load_shedder.try_enter():
+                return try_again_later(1, 503)
+            try:
+                return view(*args, **kwargs)
+            finally:
+                chat_load_shedder.exit()
+        finally:
+            user_locks.release(user_id)
+    return guarded
+
+def idempotent_chat(view):
+    """Replay the stored response for a repeated (user_id, idempotency key)."""
+    @wraps(view)
+    def replayable(*args, **kwargs):
+        data = request.get_json(silent=True) or {}
+        key = request.headers.get('Idempotency-Key') or data.get('request_id')
+        if not key:
+            return view(*args, **kwargs)
+        cache_key = (data.get('user_id', 'default_user'), str(key))
+        entry, owner = chat_responses.reserve(cache_key)
+        if not owner:
+            cached = chat_responses.wait(entry, CHAT_IDEMPOTENCY_WAIT)
+            if cached is None:
+                return try_again_later(1, 409)
+            body, status = cached
+            response = app.response_class(body, status=status, mimetype='application/json')
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            chat_responses.release(cache_key, entry)
+            raise
+        if response.status_code in (409, 429, 503):
+            # Not processed; a retry has to run for real
+            chat_responses.release(cache_key, entry)
+        else:
+            chat_responses.complete(cache_key, entry, (response.get_data(), response.status_code))
+        return response
+    return replayable
+
 @app.route('/chat', methods=['POST'])
+@idempotent_chat
+@guard_chat
 def chat():
     data = request.json
     message = data.get('message', '').strip()
@@ -210,6 +421,8 @@ def chat():
         # Relaxed regex to allow typos in service and route
         match = re.search(r'(reguler|charter drop|charter harian|charter dropp|regulerr|charter hariann)\s*(malang-juanda|juanda-malang|malang-surabaya|surabaya-malang|malang-juandaa|juanda-malangg)', message_lower)
         if match:
+            # A new booking starts from scratch, without the previous PNR
+            booking_data = state['booking_data'] = {}
             booking_data['service'] = match.group(1).lower()
             booking_data['route'] = match.group(2).lower()
             state['error_count'] = 0
@@ -368,60 +581,52 @@ def chat():
             # Save booking
             booking_data['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             booking_data['total_cost'] = calculate_price(booking_data['service'], booking_data['route'], booking_data['passengers'])
-            booking_data['pnr'] = 'KR-' + str(uuid.uuid4())[:6].upper()
             booking_data['status'] = 'pending'
 
-            # Save to CSV
-            csv_data = {
-                'timestamp': booking_data['timestamp'],
-                'name': booking_data['name'],
-                'service': booking_data['service'],
-                'route': booking_data['route'],
-                'passengers': booking_data['passengers'],
-                'phone': booking_data['phone'],
-                'address_pickup': booking_data['address_pickup'],
-                'address_dropoff': booking_data.get('address_dropoff', ''),
-                'flight': booking_data.get('flight', ''),
-                'pickup_time': booking_data['pickup_time'],
-                'pickup_date': booking_data['pickup_date'],
-                'vehicle': booking_data.get('vehicle', ''),
-                'total_cost': booking_data['total_cost']
-            }
-            df = pd.DataFrame([csv_data])
-            csv_path = 'data/bookings.csv'
-            if os.path.exists(csv_path):
-                df.to_csv(csv_path, mode='a', header=False, index=False)
-            else:
-                df.to_csv(csv_path, index=False)
+            # A retry of a confirmation that was already committed must not
+            # insert the booking again.
+            if not booking_data.get('saved'):
+                # Save to SQLite
+                conn = sqlite3.connect(DB_PATH)
+                try:
+                    cursor = conn.cursor()
+                    cursor.execute('''CREATE TABLE IF NOT EXISTS reservations
+                                    (pnr TEXT PRIMARY KEY, name TEXT, service TEXT, route TEXT, passengers INTEGER,
+                                     phone TEXT, address_pickup TEXT, address_dropoff TEXT, flight TEXT, pickup_time TEXT,
+                                     pickup_date TEXT, vehicle TEXT, total_cost INTEGER, status TEXT)''')
+                    for _ in range(PNR_ATTEMPTS):
+                        booking_data['pnr'] = 'KR-' + str(uuid.uuid4())[:6].upper()
+                        # Only a PNR collision is skipped; other constraint
+                        # failures (e.g. NOT NULL) still raise
+                        cursor.execute('''INSERT INTO reservations
+                                        (pnr, name, service, route, passengers, phone, address_pickup, address_dropoff, flight,
+                                         pickup_time, pickup_date, vehicle, total_cost, status)
+                                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                        ON CONFLICT(pnr) DO NOTHING''',
+                                       (booking_data['pnr'], booking_data['name'], booking_data['service'],
+                                        booking_data['route'], booking_data['passengers'], booking_data['phone'],
+                                        booking_data['address_pickup'], booking_data.get('address_dropoff', ''),
+                                        booking_data.get('flight', ''), booking_data['pickup_time'],
+                                        booking_data['pickup_date'], booking_data.get('vehicle', ''),
+                                        booking_data['total_cost'], booking_data['status']))
+                        # rowcount 0: the PNR belongs to another booking; draw a new one
+                        if cursor.rowcount == 1:
+                            break
+                    else:
+                        booking_data.pop('pnr', None)
+                        logging.error(f"Could not allocate a free PNR for user {user_id}")
+                        return jsonify({'response': "Maaf, pemesanan gagal disimpan. Silakan ketik 'konfirmasi' untuk mencoba lagi."})
+                    conn.commit()
+                    booking_data['saved'] = True
+                except sqlite3.IntegrityError as e:
+                    booking_data.pop('pnr', None)
+                    logging.error(f"Could not save booking for user {user_id}: {e}")
+                    return jsonify({'response': 'Maaf, pemesanan gagal disimpan. Silakan mulai lagi dengan "Pesan Reguler Malang-Juanda".'})
+                finally:
+                    conn.close()
 
-            # Save to SQLite
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute('''CREATE TABLE IF NOT EXISTS reservations
-                            (pnr TEXT PRIMARY KEY, name TEXT, service TEXT, route TEXT, passengers INTEGER,
-                             phone TEXT, address_pickup TEXT, address_dropoff TEXT, flight TEXT, pickup_time TEXT,
-                             pickup_date TEXT, vehicle TEXT, total_cost INTEGER, status TEXT)''')
-            cursor.execute('''INSERT INTO reservations
-                            (pnr, name, service, route, passengers, phone, address_pickup, address_dropoff, flight,
-                             pickup_time, pickup_date, vehicle, total_cost, status)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                           (booking_data['pnr'], booking_data['name'], booking_data['service'],
-                            booking_data['route'], booking_data['passengers'], booking_data['phone'],
-                            booking_data['address_pickup'], booking_data.get('address_dropoff', ''),
-                            booking_data.get('flight', ''), booking_data['pickup_time'],
-                            booking_data['pickup_date'], booking_data.get('vehicle', ''),
-                            booking_data['total_cost'], booking_data['status']))
-
-            conn.commit()
-            conn.close()
-
-            response = (
-                f"Pemesanan dikonfirmasi untuk {booking_data['name']}:\n"
-                f"Kode Booking: {booking_data['pnr']}\n"
-                f"Apa yang ingin dilakukan selanjutnya? Ketik: 'selesai', 'buatkan reservasi lagi', atau 'cari pesanan'."
-            )
             state['step'] = 'next_action'
-            return jsonify({'response': response})
+            return jsonify({'response': confirmation_message(booking_data)})
         elif message_lower == 'ulang':
             state['step'] = 'name'
             state['booking_data'] = {}
@@ -436,7 +641,10 @@ def chat():
             return jsonify({'response': "Silakan ketik 'konfirmasi' untuk melanjutkan, 'ulang' untuk mengisi ulang, atau 'batal' untuk membatalkan."})
     
     elif state['step'] == 'next_action':
-        if message_lower == 'selesai':
+        if message_lower in ['konfirmasi', 'confirm', 'confirmed'] and booking_data.get('pnr'):
+            # Retried confirmation: answer with the booking already made
+            return jsonify({'response': confirmation_message(booking_data)})
+        elif message_lower == 'selesai':
             state['step'] = None
             state['booking_data'] = {}
             return jsonify({'response': 'Terima kasih! Silakan ketik "Pesan Reguler Malang-Juanda" untuk memesan lagi.'})
@@ -453,9 +661,9 @@ def chat():
     
     elif state['step'] == 'check_reservation':
         if re.match(r'^(KIR|KR)-[A-Z0-9]{4,6}$', message):
-            conn = sqlite3.connect('../backend/database/reservations.db')
+            conn = sqlite3.connect(DB_PATH)
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM reservations WHERE pnr = ?", (message,))
+            cursor.execute(RESERVATION_BY_PNR, (message,))
             reservation = cursor.fetchone()
             conn.close()
             if reservation:
@@ -531,69 +739,58 @@ def get_reservations():
         if 'pnr' not in columns:
             conn.close()
             return jsonify({'reservations': [], 'error': 'Database schema mismatch: missing pnr column'})
-        cursor.execute("SELECT pnr, name, service, route, passengers, total_cost, status, pickup_date, pickup_time, address_pickup, address_dropoff FROM reservations")
+        cursor.execute(LIST_RESERVATIONS)
         reservations_raw = cursor.fetchall()
         conn.close()
 
-        reservations = []
-        for row in reservations_raw:
-            pnr, name, service, route, passengers, total_cost, status, pickup_date, pickup_time, address_pickup, address_dropoff = row
-            if '-' in route:
-                route_origin, route_destination = route.split('-', 1)
-            else:
-                route_origin, route_destination = route, ''
-            reservation = {
-                'reservation_id': pnr,
-                'customer_name': name,
-                'reservation_timestamp': None,
-                'route_origin': route_origin.strip(),
-                'route_destination': route_destination.strip(),
-                'reservation_type': service,
-                'num_passengers': passengers,
-                'travel_date': pickup_date,
-                'pickup_time': pickup_time,
-                'pickup_address': address_pickup,
-                'dropoff_address': address_dropoff,
-                'flight_details': None,
-                'notes': None,
-                'cancellation_reason': None,
-                'price': total_cost,
-                'status': status
-            }
-            reservations.append(reservation)
-
-        return jsonify(reservations)
+        if request.args.get('format') == 'columnar':
+            return fast_jsonify(reservation_columns(reservations_raw))
+        return fast_jsonify(reservation_records(reservations_raw))
     except Exception as e:
         import traceback
         error_msg = traceback.format_exc()
         app.logger.error(f"Error in get_reservations: {error_msg}")
         return jsonify({'reservations': [], 'error': str(e)})
 
+@app.route('/reservations/export', methods=['GET'])
+def export_reservations():
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported export format: {fmt}'}), 400
+    try:
+        chunk_size = int(request.args.get('chunk_size', DEFAULT_CHUNK_SIZE))
+    except ValueError:
+        return jsonify({'error': 'chunk_size must be an integer'}), 400
+    if fmt == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return jsonify({'error': 'Parquet export requires pyarrow'}), 501
+
+    # Open the snapshot and run the query before the 200 goes out, so a
+    # failure is a JSON error rather than a truncated download.
+    try:
+        chunks = iter_reservation_chunks(DB_PATH, request.args.get('start_date'), request.args.get('end_date'),
+                                         parse_statuses(request.args.get('status')), max(1, min(chunk_size, 50000)),
+                                         service=request.args.get('service'), route=request.args.get('route'))
+    except sqlite3.Error as e:
+        app.logger.error(f"Error in export_reservations: {e}")
+        return jsonify({'error': f'Reservations database unavailable: {e}'}), 503
+    filename = f"reservations.{fmt}"
+    response = Response(stream_with_context(stream_export(fmt, chunks)), mimetype=EXPORT_FORMATS[fmt],
+                        headers={'Content-Disposition': f'attachment; filename={filename}'})
+    response.call_on_close(chunks.close)
+    return response
+
 @app.route('/api/reports', methods=['GET'])
 def get_reports():
     try:
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM reservations")
-        total_reservations = cursor.fetchone()[0]
-
-        cursor.execute("SELECT status, COUNT(*) FROM reservations GROUP BY status")
-        status_counts = dict(cursor.fetchall())
-
-        cursor.execute("SELECT SUM(total_cost) FROM reservations")
-        total_revenue = cursor.fetchone()[0] or 0
-
-        cursor.execute("SELECT AVG(total_cost) FROM reservations")
-        avg_booking_value = cursor.fetchone()[0] or 0
-
+        cursor.execute(REPORT_STATUS_TOTALS)
+        report = summarize_status_totals(cursor.fetchall())
         conn.close()
 
-        report = {
-            "total_reservations": total_reservations,
-            "status_counts": status_counts,
-            "total_revenue": total_revenue,
-            "avg_booking_value": avg_booking_value
-        }
         return jsonify(report)
     except Exception as e:
         import traceback
@@ -1,16 +1,79 @@
+import os
+import re
 import sqlite3
 
-def apply_schema(db_path: str, schema_path: str):
-    with open(schema_path, 'r') as f:
-        schema_sql = f.read()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    # Drop table if exists to avoid conflicts
-    cursor.execute("DROP TABLE IF EXISTS reservations")
-    cursor.executescript(schema_sql)
-    conn.commit()
-    conn.close()
-    print(f"Schema applied successfully to {db_path}")
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE_RE = re.compile(r'^(\d+)_\w+\.sql$')
+
+def list_migrations(migrations_dir: str = MIGRATIONS_DIR):
+    migrations = []
+    for filename in os.listdir(migrations_dir):
+        match = MIGRATION_FILE_RE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), os.path.join(migrations_dir, filename)))
+    return sorted(migrations)
+
+def get_schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(db_path: str, migrations_dir: str = MIGRATIONS_DIR) -> int:
+    """Apply pending migrations in place and return the resulting schema version.
+
+    The version is tracked in ``PRAGMA user_version``. Each migration runs in
+    its own transaction together with the version bump, so a failed migration
+    leaves the database at the previous version with its data untouched.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        version = start_version = get_schema_version(conn)
+        for number, path in list_migrations(migrations_dir):
+            if number <= version:
+                continue
+            with open(path, 'r') as f:
+                sql = f.read()
+            try:
+                # IMMEDIATE plus a re-check, so workers migrating the same file
+                # at startup apply each migration once.
+                conn.execute("BEGIN IMMEDIATE")
+                if get_schema_version(conn) >= number:
+                    conn.execute("ROLLBACK")
+                    version = get_schema_version(conn)
+                    continue
+                for statement in _split_statements(sql):
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {number}")
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+            version = number
+            print(f"Applied migration {os.path.basename(path)} to {db_path}")
+        # WAL lets the read-only reporting connections see a consistent
+        # snapshot without blocking booking writes (persists in the file).
+        conn.execute("PRAGMA journal_mode = WAL")
+        if version != start_version:
+            # Refresh planner statistics for the new indexes
+            conn.execute("ANALYZE")
+        return version
+    finally:
+        conn.close()
+
+def _split_statements(sql: str):
+    statement = ''
+    for line in sql.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            if statement.strip():
+                yield statement
+            statement = ''
+    remainder = '\n'.join(l for l in statement.splitlines() if not l.strip().startswith('--'))
+    if remainder.strip():
+        raise sqlite3.OperationalError(f"Incomplete SQL statement in migration: {statement.strip()}")
+
+def apply_schema(db_path: str, migrations_dir: str = MIGRATIONS_DIR):
+    version = migrate(db_path, migrations_dir)
+    print(f"Schema at version {version} in {db_path}")
 
 if __name__ == "__main__":
-    apply_schema('./backend/database/reservations.db', './backend/database/database_schema.sql')
\ No newline at end of file
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    apply_schema(os.path.join(base_dir, 'reservations.db'))
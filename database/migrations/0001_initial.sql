@@ -1,4 +1,4 @@
-CREATE TABLE reservations (
+CREATE TABLE IF NOT EXISTS reservations (
     pnr TEXT PRIMARY KEY,
     name TEXT NOT NULL,
     service TEXT NOT NULL,
@@ -16,5 +16,5 @@ CREATE TABLE reservations (
 );
 
 -- Index for quick search
-CREATE INDEX idx_reservations_pickup_date ON reservations(pickup_date);
-CREATE INDEX idx_reservations_phone ON reservations(phone);
+CREATE INDEX IF NOT EXISTS idx_reservations_pickup_date ON reservations(pickup_date);
+CREATE INDEX IF NOT EXISTS idx_reservations_phone ON reservations(phone);
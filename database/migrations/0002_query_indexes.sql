@@ -0,0 +1,16 @@
+-- Indexes for the queries in database/queries.py. Each one is checked by
+-- tests/test_query_plans.py.
+
+-- Exports filtered by a pickup_date range
+CREATE INDEX IF NOT EXISTS idx_reservations_pickup ON reservations(pickup_date, pickup_time);
+DROP INDEX IF EXISTS idx_reservations_pickup_date;
+
+-- /api/reports: covering index for COUNT/SUM per status
+CREATE INDEX IF NOT EXISTS idx_reservations_status_cost ON reservations(status, total_cost);
+
+-- Exports filtered by status and pickup_date range
+CREATE INDEX IF NOT EXISTS idx_reservations_status_pickup ON reservations(status, pickup_date);
+
+-- Exports filtered by service and/or route and pickup_date range
+CREATE INDEX IF NOT EXISTS idx_reservations_service_route ON reservations(service, route, pickup_date);
+CREATE INDEX IF NOT EXISTS idx_reservations_route ON reservations(route, pickup_date);
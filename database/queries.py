@@ -0,0 +1,93 @@
+# SQL for the production read paths. Kept in one place so that
+# tests/test_query_plans.py can EXPLAIN exactly what the apps run.
+
+RESERVATION_BY_PNR = "SELECT * FROM reservations WHERE pnr = ?"
+
+LIST_RESERVATIONS = (
+    "SELECT pnr, name, service, route, passengers, total_cost, status, pickup_date, pickup_time, "
+    "address_pickup, address_dropoff FROM reservations"
+)
+
+# One pass over idx_reservations_status_cost instead of four table scans
+REPORT_STATUS_TOTALS = (
+    "SELECT status, COUNT(*), COUNT(total_cost), SUM(total_cost) FROM reservations GROUP BY status"
+)
+
+def summarize_status_totals(rows):
+    """Fold REPORT_STATUS_TOTALS rows into the /api/reports payload."""
+    status_counts = {}
+    total_reservations = priced = total_revenue = 0
+    for status, count, cost_count, cost_sum in rows:
+        status_counts[status] = count
+        total_reservations += count
+        priced += cost_count
+        total_revenue += cost_sum or 0
+    return {
+        "total_reservations": total_reservations,
+        "status_counts": status_counts,
+        "total_revenue": total_revenue,
+        "avg_booking_value": total_revenue / priced if priced else 0
+    }
+
+def _split_route(route):
+    if route and '-' in route:
+        route_origin, route_destination = route.split('-', 1)
+    else:
+        route_origin, route_destination = route or '', ''
+    return route_origin.strip(), route_destination.strip()
+
+def reservation_records(rows):
+    """Shape LIST_RESERVATIONS rows as the /reservations/ record list."""
+    records = []
+    for pnr, name, service, route, passengers, total_cost, status, pickup_date, pickup_time, address_pickup, address_dropoff in rows:
+        route_origin, route_destination = _split_route(route)
+        records.append({
+            'reservation_id': pnr,
+            'customer_name': name,
+            'reservation_timestamp': None,
+            'route_origin': route_origin,
+            'route_destination': route_destination,
+            'reservation_type': service,
+            'num_passengers': passengers,
+            'travel_date': pickup_date,
+            'pickup_time': pickup_time,
+            'pickup_address': address_pickup,
+            'dropoff_address': address_dropoff,
+            'flight_details': None,
+            'notes': None,
+            'cancellation_reason': None,
+            'price': total_cost,
+            'status': status
+        })
+    return records
+
+# Column-oriented /reservations/?format=columnar: one array per field, and
+# none of the always-null fields of the record format.
+RESERVATION_COLUMNS = [
+    'reservation_id', 'customer_name', 'route_origin', 'route_destination', 'reservation_type',
+    'num_passengers', 'travel_date', 'pickup_time', 'pickup_address', 'dropoff_address',
+    'price', 'status'
+]
+
+def reservation_columns(rows):
+    """Shape LIST_RESERVATIONS rows as ``{'columns': [...], 'data': {column: values}}``."""
+    if rows:
+        pnr, name, service, route, passengers, total_cost, status, pickup_date, pickup_time, address_pickup, address_dropoff = map(list, zip(*rows))
+    else:
+        pnr = name = service = route = passengers = total_cost = status = pickup_date = pickup_time = address_pickup = address_dropoff = []
+    routes = [_split_route(r) for r in route]
+    data = {
+        'reservation_id': pnr,
+        'customer_name': name,
+        'route_origin': [r[0] for r in routes],
+        'route_destination': [r[1] for r in routes],
+        'reservation_type': service,
+        'num_passengers': passengers,
+        'travel_date': pickup_date,
+        'pickup_time': pickup_time,
+        'pickup_address': address_pickup,
+        'dropoff_address': address_dropoff,
+        'price': total_cost,
+        'status': status
+    }
+    return {'columns': RESERVATION_COLUMNS, 'length': len(rows), 'data': data}
@@ -0,0 +1,205 @@
+import fcntl
+import logging
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+class ReadOnlyPool:
+    """Fixed-size pool of read-only SQLite connections.
+
+    Connections are opened with ``mode=ro`` and ``PRAGMA query_only`` so the
+    reporting app can never take a write lock. Each checkout runs inside a
+    read transaction, which in WAL mode pins one consistent snapshot for every
+    statement of the request without blocking writers.
+
+    Outside WAL mode that read transaction holds a SHARED lock and booking
+    commits fail with "database is locked", so a database in any other
+    journal mode is logged, or refused when ``require_wal`` is set.
+    """
+
+    def __init__(self, db_path: str, size: int = 4, timeout: float = 5.0, require_wal: bool = False):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.require_wal = require_wal
+        self._warned_journal_mode = False
+        self._generation = 0
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True,
+                               isolation_level=None, check_same_thread=False,
+                               timeout=self.timeout)
+        conn.execute("PRAGMA query_only = 1")
+        self._check_journal_mode(conn)
+        return conn
+
+    def _check_journal_mode(self, conn):
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0].lower()
+        if mode == 'wal':
+            return
+        message = f"{self.db_path} is in journal_mode={mode}, not wal; reads will block writers"
+        if self.require_wal:
+            conn.close()
+            raise sqlite3.OperationalError(message)
+        if not self._warned_journal_mode:
+            self._warned_journal_mode = True
+            logging.getLogger(__name__).warning(message)
+
+    def _checkout(self):
+        try:
+            generation, conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._opened < self.size
+                if can_open:
+                    self._opened += 1
+            if can_open:
+                try:
+                    return self._generation, self._connect()
+                except sqlite3.Error:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            try:
+                generation, conn = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise sqlite3.OperationalError("No read-only connection available")
+        if generation != self._generation:
+            # The database file was swapped (replica refresh); reopen.
+            conn.close()
+            try:
+                return self._generation, self._connect()
+            except sqlite3.Error:
+                with self._lock:
+                    self._opened -= 1
+                raise
+        return generation, conn
+
+    @contextmanager
+    def connection(self):
+        generation, conn = self._checkout()
+        healthy = True
+        try:
+            conn.execute("BEGIN")
+            yield conn
+        except sqlite3.Error:
+            healthy = False
+            raise
+        finally:
+            try:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                healthy = False
+            if healthy:
+                self._idle.put((generation, conn))
+            else:
+                conn.close()
+                with self._lock:
+                    self._opened -= 1
+
+    def invalidate(self):
+        """Make every pooled connection reopen on its next checkout."""
+        self._generation += 1
+
+    def close(self):
+        while True:
+            try:
+                _, conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+def backup_database(source_path: str, replica_path: str):
+    """Copy ``source_path`` to ``replica_path`` with the SQLite backup API.
+
+    The copy is written next to the replica and renamed over it, so readers
+    of the replica never see a half-written file.
+    """
+    directory = os.path.dirname(os.path.abspath(replica_path))
+    fd, tmp_path = tempfile.mkstemp(suffix='.db', dir=directory)
+    os.close(fd)
+    try:
+        source = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+        target = sqlite3.connect(tmp_path)
+        try:
+            # One step under a single read transaction: in WAL mode this does
+            # not block writers, and the copy never restarts on their commits.
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        os.replace(tmp_path, replica_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class ReplicaRefresher:
+    """Keeps a replica file at most ``interval`` seconds old.
+
+    Every worker process runs one, but the copy is made once per host: a
+    refresh holds an exclusive lock on ``<replica>.lock`` and skips the backup
+    when another process has already refreshed the replica within the last
+    half interval. Workers that skip only reopen their pool once they see the
+    replica file has been replaced.
+    """
+
+    def __init__(self, source_path: str, replica_path: str, interval: float, pool: ReadOnlyPool = None):
+        self.source_path = source_path
+        self.replica_path = replica_path
+        self.interval = interval
+        self.pool = pool
+        self.last_refresh = None
+        self._replica_id = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self, force: bool = True):
+        with open(self.replica_path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    age = time.time() - os.path.getmtime(self.replica_path)
+                except FileNotFoundError:
+                    age = None
+                if force or age is None or age >= self.interval / 2:
+                    backup_database(self.source_path, self.replica_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self.reopen_if_replaced()
+
+    def reopen_if_replaced(self):
+        stat = os.stat(self.replica_path)
+        replica_id = (stat.st_ino, stat.st_mtime_ns)
+        if replica_id != self._replica_id:
+            self._replica_id = replica_id
+            self.last_refresh = stat.st_mtime
+            if self.pool is not None:
+                self.pool.invalidate()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh(force=False)
+            except (sqlite3.Error, OSError) as e:
+                logging.getLogger(__name__).warning(f"Replica refresh of {self.replica_path} failed: {e}")
+
+    def start(self):
+        self.refresh(force=False)
+        self._thread = threading.Thread(target=self._run, name='replica-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,121 @@
+"""Bounded TTL cache of recent responses keyed by client idempotency keys.
+
+A retried request whose key is already cached gets the stored response back
+without running the handler again. A retry that arrives while the first
+attempt is still running waits for that attempt instead of starting a second
+one. ``KeyedLocks`` serializes requests per user, with a bounded number of
+idle locks.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+class _Entry:
+    __slots__ = ('done', 'response', 'expires_at')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.expires_at = None
+
+class IdempotencyCache:
+    def __init__(self, max_entries=10000, ttl=600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            expired = entry.expires_at is not None and entry.expires_at <= now
+            if not expired and len(self._entries) < self.max_entries:
+                break
+            del self._entries[key]
+
+    def reserve(self, key, now=None):
+        """Return ``(entry, owner)``.
+
+        ``owner`` is True when the caller must run the request and then call
+        ``complete`` or ``release``; otherwise ``entry`` belongs to an earlier
+        attempt and the caller should ``wait`` on it.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.expires_at is None or entry.expires_at > now):
+                return entry, False
+            self._evict(now)
+            entry = self._entries[key] = _Entry()
+            return entry, True
+
+    def complete(self, key, entry, response, now=None):
+        now = time.monotonic() if now is None else now
+        entry.response = response
+        entry.expires_at = now + self.ttl
+        with self._lock:
+            if self._entries.get(key) is entry:
+                self._entries.move_to_end(key)
+        entry.done.set()
+
+    def release(self, key, entry):
+        """Forget a reservation whose request failed, so a retry runs again."""
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        entry.done.set()
+
+    def wait(self, entry, timeout):
+        """Return the earlier attempt's response, or None if it is unavailable."""
+        entry.done.wait(timeout)
+        return entry.response
+
+class KeyedLocks:
+    """One lock per key (e.g. user_id), keeping at most ``max_idle`` idle ones.
+
+    Locks that nobody holds or waits for are evicted oldest first, so keys
+    that are never seen again do not accumulate.
+    """
+
+    def __init__(self, max_idle=10000):
+        self.max_idle = max_idle
+        self._locks = OrderedDict()  # key -> [lock, holders and waiters]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._locks)
+
+    def acquire(self, key, timeout=-1):
+        """Return True once ``key`` is held; False if ``timeout`` ran out."""
+        with self._lock:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [threading.Lock(), 0]
+            else:
+                self._locks.move_to_end(key)
+            entry[1] += 1
+        if entry[0].acquire(timeout=timeout):
+            return True
+        self._forget(key, entry)
+        return False
+
+    def release(self, key):
+        entry = self._locks[key]
+        entry[0].release()
+        self._forget(key, entry)
+
+    def _forget(self, key, entry):
+        with self._lock:
+            entry[1] -= 1
+            if len(self._locks) <= self.max_idle:
+                return
+            excess = len(self._locks) - self.max_idle
+            stale = []
+            # Oldest first; held keys were moved to the end when taken
+            for idle_key, idle in self._locks.items():
+                if len(stale) == excess:
+                    break
+                if idle[1] == 0:
+                    stale.append(idle_key)
+            for idle_key in stale:
+                del self._locks[idle_key]
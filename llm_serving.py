@@ -0,0 +1,181 @@
+"""Serving layer for /llama/respond.
+
+Requests are queued and a single scheduler thread groups them into
+micro-batches (up to ``max_batch_size`` prompts, waiting at most ``max_wait``
+seconds for a batch to fill). Each batch is one call into the model backend,
+so the cost of a decoding step is shared by every prompt in it. Tokens are
+handed back to each request as they are produced, which lets the endpoint
+stream them. Completed answers go into an LRU cache so repeated prompts, such
+as FAQ-style questions, skip the model entirely.
+
+A backend is any object with ``generate_batch(prompts, max_tokens)`` that
+yields one list per decoding step, holding the next token for each prompt
+(or None once that prompt has finished).
+"""
+import importlib
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+_DONE = object()
+
+class FakeBackend:
+    """Deterministic stand-in for a local model, used by default and in tests.
+
+    Echoes the prompt the way the old stub did, one word per step. ``step_delay``
+    simulates a forward pass whose cost does not depend on the batch size.
+    """
+
+    def __init__(self, step_delay=0.0):
+        self.step_delay = step_delay
+        self.batch_sizes = []
+
+    def _tokens(self, prompt):
+        words = f"Llama Maverick response for: {prompt}".split(' ')
+        return [words[0]] + [' ' + w for w in words[1:]]
+
+    def generate_batch(self, prompts, max_tokens):
+        self.batch_sizes.append(len(prompts))
+        outputs = [self._tokens(p)[:max_tokens] for p in prompts]
+        for step in range(max((len(o) for o in outputs), default=0)):
+            if self.step_delay:
+                time.sleep(self.step_delay)
+            yield [o[step] if step < len(o) else None for o in outputs]
+
+def load_backend(spec):
+    """Build a backend from ``'fake'`` or a ``'package.module:ClassName'`` path."""
+    if not spec or spec == 'fake':
+        return FakeBackend()
+    module_name, _, class_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)()
+
+class GenerationRequest:
+    def __init__(self, prompt, max_tokens):
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self._tokens = queue.Queue()
+        self._error = None
+
+    def put(self, token):
+        self._tokens.put(token)
+
+    def finish(self, error=None):
+        self._error = error
+        self._tokens.put(_DONE)
+
+    def tokens(self, timeout=None):
+        while True:
+            token = self._tokens.get(timeout=timeout)
+            if token is _DONE:
+                if self._error is not None:
+                    raise self._error
+                return
+            yield token
+
+    def result(self, timeout=None):
+        return ''.join(self.tokens(timeout))
+
+class LRUCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class MicroBatcher:
+    def __init__(self, backend, max_batch_size=8, max_wait=0.01):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, prompt, max_tokens):
+        self._ensure_started()
+        request = GenerationRequest(prompt, max_tokens)
+        self._pending.put(request)
+        return request
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='llama-batcher', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._pending.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._pending.get(timeout=remaining) if remaining > 0 else self._pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            # Requests with different limits share one batch; trim per request.
+            max_tokens = max(r.max_tokens for r in batch)
+            produced = [0] * len(batch)
+            try:
+                for step in self.backend.generate_batch([r.prompt for r in batch], max_tokens):
+                    for i, token in enumerate(step):
+                        if token is not None and produced[i] < batch[i].max_tokens:
+                            batch[i].put(token)
+                            produced[i] += 1
+            except Exception as e:
+                for r in batch:
+                    r.finish(e)
+                continue
+            for r in batch:
+                r.finish()
+
+class LlamaService:
+    def __init__(self, backend, max_batch_size=8, max_wait=0.01, cache_size=1024):
+        self.batcher = MicroBatcher(backend, max_batch_size, max_wait)
+        self.cache = LRUCache(cache_size)
+
+    def stream(self, prompt, max_tokens=256, timeout=None):
+        """Yield answer tokens as the model produces them.
+
+        Runs of whitespace in the prompt are collapsed before it reaches the
+        model, so prompts differing only in spacing share one cache entry
+        without one caller getting another's text back. Case is kept.
+        """
+        prompt = ' '.join(prompt.split())
+        key = (prompt, max_tokens)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        tokens = []
+        for token in self.batcher.submit(prompt, max_tokens).tokens(timeout):
+            tokens.append(token)
+            yield token
+        self.cache.put(key, ''.join(tokens))
+
+    def respond(self, prompt, max_tokens=256, timeout=None):
+        return ''.join(self.stream(prompt, max_tokens, timeout))
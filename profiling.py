@@ -0,0 +1,245 @@
+"""Opt-in request profiling for the Flask app.
+
+Three independent switches, all off by default:
+
+* ``mode='cprofile'`` runs cProfile around a random ``sample_rate`` fraction
+  of requests and merges the results into one pstats profile. Only one
+  request per process is profiled at a time: on Python 3.12+ cProfile hooks
+  the whole interpreter, so a profile also counts calls made by other
+  threads while it is enabled, and a second profiler cannot be enabled.
+* ``mode='sample'`` has a background thread record the stacks of the sampled
+  requests every ``sample_interval`` seconds, aggregated as collapsed stacks
+  (the input format of flamegraph.pl and speedscope).
+* ``slow_ms`` makes a watchdog thread capture the stack of any request still
+  running after that many milliseconds, with its method and path.
+
+When nothing is switched on, ``init_app`` registers no hooks, so requests pay
+nothing. Results are served by ``/admin/profiles`` when an admin token is set.
+"""
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from collections import Counter, deque
+
+PROFILE_MODES = ('off', 'cprofile', 'sample')
+
+# Held while a cProfile.Profile is enabled anywhere in the process
+_cprofile_lock = threading.Lock()
+
+def collapse_stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class _RequestToken:
+    __slots__ = ('thread_id', 'label', 'started', 'profile', 'sampled', 'slow_captured')
+
+    def __init__(self, thread_id, label, started):
+        self.thread_id = thread_id
+        self.label = label
+        self.started = started
+        self.profile = None
+        self.sampled = False
+        self.slow_captured = False
+
+class RequestProfiler:
+    def __init__(self, mode='off', sample_rate=0.01, slow_ms=0, sample_interval=0.005,
+                 max_slow_requests=100, admin_token=None):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.sample_interval = sample_interval
+        self.admin_token = admin_token
+        self.slow_requests = deque(maxlen=max_slow_requests)
+        self.stack_samples = Counter()
+        self.profiled_requests = 0
+        self._stats = None
+        self._active = {}
+        self._lock = threading.Lock()
+        self._threads_started = False
+
+    @property
+    def enabled(self):
+        return self.mode != 'off' or self.slow_ms > 0
+
+    # -- per-request hooks ---------------------------------------------------
+    def begin(self, label):
+        token = _RequestToken(threading.get_ident(), label, time.monotonic())
+        if self.mode != 'off' and random.random() < self.sample_rate:
+            if self.mode == 'cprofile':
+                # Skip the sample rather than wait if another request is profiled
+                if _cprofile_lock.acquire(blocking=False):
+                    profile = cProfile.Profile()
+                    try:
+                        profile.enable()
+                        token.profile = profile
+                    except ValueError:
+                        # A profiler outside this module is active
+                        _cprofile_lock.release()
+            else:
+                token.sampled = True
+        with self._lock:
+            self._active[token.thread_id] = token
+        return token
+
+    def end(self, token):
+        if token.profile is not None:
+            token.profile.disable()
+            _cprofile_lock.release()
+        with self._lock:
+            self._active.pop(token.thread_id, None)
+            if token.profile is not None:
+                if self._stats is None:
+                    self._stats = pstats.Stats(token.profile)
+                else:
+                    self._stats.add(token.profile)
+            if token.profile is not None or token.sampled:
+                self.profiled_requests += 1
+
+    # -- background threads --------------------------------------------------
+    def _sample_once(self):
+        frames = sys._current_frames()
+        with self._lock:
+            tokens = [t for t in self._active.values() if t.sampled]
+            for token in tokens:
+                frame = frames.get(token.thread_id)
+                if frame is not None:
+                    self.stack_samples[collapse_stack(frame)] += 1
+
+    def _check_slow_once(self, now=None):
+        now = time.monotonic() if now is None else now
+        threshold = self.slow_ms / 1000
+        with self._lock:
+            overdue = [t for t in self._active.values() if not t.slow_captured and now - t.started >= threshold]
+        if not overdue:
+            return
+        frames = sys._current_frames()
+        for token in overdue:
+            frame = frames.get(token.thread_id)
+            token.slow_captured = True
+            self.slow_requests.append({
+                'request': token.label,
+                'elapsed_ms': round((now - token.started) * 1000, 1),
+                'captured_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'stack': traceback.format_stack(frame) if frame is not None else [],
+            })
+
+    def _loop(self, interval, fn):
+        while True:
+            time.sleep(interval)
+            fn()
+
+    def start_threads(self):
+        if self._threads_started:
+            return
+        self._threads_started = True
+        if self.mode == 'sample':
+            threading.Thread(target=self._loop, args=(self.sample_interval, self._sample_once),
+                             name='profile-sampler', daemon=True).start()
+        if self.slow_ms > 0:
+            threading.Thread(target=self._loop, args=(self.slow_ms / 2000, self._check_slow_once),
+                             name='slow-request-watchdog', daemon=True).start()
+
+    # -- results -------------------------------------------------------------
+    def cprofile_text(self, limit=50):
+        stream = io.StringIO()
+        with self._lock:
+            if self._stats is None:
+                return 'No profiled requests yet.\n'
+            self._stats.stream = stream
+            self._stats.sort_stats('cumulative').print_stats(limit)
+        return stream.getvalue()
+
+    def cprofile_dump(self):
+        """Return the merged profile in the binary pstats format (for snakeviz etc.)."""
+        with self._lock:
+            if self._stats is None:
+                return None
+            fd, path = tempfile.mkstemp(suffix='.prof')
+            os.close(fd)
+            try:
+                self._stats.dump_stats(path)
+                with open(path, 'rb') as f:
+                    return f.read()
+            finally:
+                os.remove(path)
+
+    def collapsed_stacks(self):
+        with self._lock:
+            return ''.join(f"{stack} {count}\n" for stack, count in self.stack_samples.most_common())
+
+    def reset(self):
+        with self._lock:
+            self._stats = None
+            self.stack_samples.clear()
+            self.slow_requests.clear()
+            self.profiled_requests = 0
+
+    # -- Flask wiring --------------------------------------------------------
+    def init_app(self, app):
+        from flask import Response, abort, g, jsonify, request
+
+        if self.enabled:
+            @app.before_request
+            def _profile_begin():
+                g._profile_token = self.begin(f"{request.method} {request.path}")
+
+            @app.teardown_request
+            def _profile_end(exc):
+                token = g.pop('_profile_token', None)
+                if token is not None:
+                    self.end(token)
+
+            self.start_threads()
+
+        if not self.admin_token:
+            return
+
+        def check_token():
+            supplied = request.headers.get('X-Admin-Token', '')
+            if not hmac.compare_digest(supplied.encode(), self.admin_token.encode()):
+                abort(404)
+
+        @app.route('/admin/profiles', methods=['GET'])
+        def download_profiles():
+            check_token()
+            kind = request.args.get('kind', 'summary')
+            if kind == 'cprofile':
+                if request.args.get('format') == 'text':
+                    return Response(self.cprofile_text(int(request.args.get('limit', 50))), mimetype='text/plain')
+                data = self.cprofile_dump()
+                if data is None:
+                    return jsonify({'error': 'No profiled requests yet'}), 404
+                return Response(data, mimetype='application/octet-stream',
+                                headers={'Content-Disposition': 'attachment; filename=chatbot.prof'})
+            if kind == 'stacks':
+                return Response(self.collapsed_stacks(), mimetype='text/plain')
+            if kind == 'slow':
+                return jsonify({'slow_ms': self.slow_ms, 'requests': list(self.slow_requests)})
+            return jsonify({
+                'mode': self.mode,
+                'sample_rate': self.sample_rate,
+                'slow_ms': self.slow_ms,
+                'profiled_requests': self.profiled_requests,
+                'stack_samples': sum(self.stack_samples.values()),
+                'slow_requests': len(self.slow_requests),
+            })
+
+        @app.route('/admin/profiles/reset', methods=['POST'])
+        def reset_profiles():
+            check_token()
+            self.reset()
+            return jsonify({'status': 'ok'})
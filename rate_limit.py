@@ -0,0 +1,111 @@
+"""Token-bucket rate limiting and in-flight load shedding for /chat.
+
+Buckets live either in process memory (``MemoryBucketStore``) or in a small
+SQLite file shared by every worker on the host (``SQLiteBucketStore``). Both
+expose ``consume(key, rate, burst)`` returning ``(allowed, retry_after)``.
+"""
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+def _refill(tokens, updated, rate, burst, now):
+    return min(burst, tokens + (now - updated) * rate)
+
+def _take(tokens, rate):
+    """Return ``(allowed, tokens_left, retry_after_seconds)`` for one request."""
+    if tokens >= 1:
+        return True, tokens - 1, 0
+    return False, tokens, max(1, math.ceil((1 - tokens) / rate))
+
+class MemoryBucketStore:
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, rate, burst, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated = self._buckets[key]
+                tokens = _refill(tokens, updated, rate, burst, now)
+                self._buckets.move_to_end(key)
+            else:
+                tokens = burst
+                if len(self._buckets) >= self.max_keys:
+                    # Least recently seen key; it has refilled long ago anyway
+                    self._buckets.popitem(last=False)
+            allowed, tokens, retry_after = _take(tokens, rate)
+            self._buckets[key] = (tokens, now)
+        return allowed, retry_after
+
+class SQLiteBucketStore:
+    """Buckets shared across worker processes through one SQLite file."""
+
+    def __init__(self, db_path, idle_ttl=3600):
+        self.db_path = db_path
+        self.idle_ttl = idle_ttl
+        self._local = threading.local()
+        self._calls = 0
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS rate_limit_buckets "
+                     "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=1.0)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = OFF")
+            self._local.conn = conn
+        return conn
+
+    def consume(self, key, rate, burst, now=None):
+        # Wall clock: monotonic clocks are not comparable across processes
+        now = time.time() if now is None else now
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(row[0], row[1], rate, burst, now) if row else burst
+            allowed, tokens, retry_after = _take(tokens, rate)
+            conn.execute("INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                         (key, tokens, now))
+            self._calls += 1
+            if self._calls % 1000 == 0:
+                conn.execute("DELETE FROM rate_limit_buckets WHERE updated < ?", (now - self.idle_ttl,))
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+class RateLimiter:
+    def __init__(self, store, rate, burst):
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+
+    def check(self, key):
+        return self.store.consume(key, self.rate, self.burst)
+
+class LoadShedder:
+    """Rejects new work once ``max_in_flight`` requests are already running."""
+
+    def __init__(self, max_in_flight):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_enter(self):
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                return False
+            self.in_flight += 1
+            return True
+
+    def exit(self):
+        with self._lock:
+            self.in_flight -= 1
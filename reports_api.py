@@ -1,56 +1,64 @@
 from flask import Flask, jsonify, request
-import sqlite3
+import os
+
+from database.queries import (LIST_RESERVATIONS, REPORT_STATUS_TOTALS, reservation_columns, reservation_records,
+                              summarize_status_totals)
+from database.read_pool import ReadOnlyPool, ReplicaRefresher
+from serialization import fast_jsonify
 
 app = Flask(__name__)
 
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+DB_PATH = os.environ.get('REPORTS_DB_PATH', os.path.join(BASE_DIR, 'database', 'reservations.db'))
+# Optional replica refreshed from DB_PATH with the backup API; when set, all
+# reporting reads go to the replica and never touch the booking database.
+# Each worker runs a refresher, but only one copy is made per interval per
+# host; the other workers just reopen the replica.
+REPLICA_PATH = os.environ.get('REPORTS_REPLICA_PATH')
+REPLICA_REFRESH_SECONDS = float(os.environ.get('REPORTS_REPLICA_REFRESH_SECONDS', 300))
+POOL_SIZE = int(os.environ.get('REPORTS_POOL_SIZE', 4))
+
+# Nothing writes to the replica, so only the live database must be in WAL mode
+read_pool = ReadOnlyPool(REPLICA_PATH or DB_PATH, size=POOL_SIZE, require_wal=not REPLICA_PATH)
+replica_refresher = None
+if REPLICA_PATH:
+    replica_refresher = ReplicaRefresher(DB_PATH, REPLICA_PATH, REPLICA_REFRESH_SECONDS, read_pool)
+    replica_refresher.start()
+
 @app.route('/reservations/', methods=['GET'])
 def get_reservations():
     try:
-        conn = sqlite3.connect('backend/database/reservations.db')
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA table_info(reservations)")
-        columns = [col[1] for col in cursor.fetchall()]
-        if 'pnr' not in columns:
-            conn.close()
-            return jsonify({'reservations': [], 'error': 'Database schema mismatch: missing pnr column'})
-        cursor.execute("SELECT pnr, name, service, route, passengers, total_cost, status FROM reservations")
-        reservations_raw = cursor.fetchall()
-        conn.close()
-
-        reservations = []
-        for row in reservations_raw:
-            pnr, name, service, route, passengers, total_cost, status = row
-            # Split route into origin and destination
-            if '-' in route:
-                route_origin, route_destination = route.split('-', 1)
-            else:
-                route_origin, route_destination = route, ''
-            reservation = {
-                'reservation_id': pnr,
-                'customer_name': name,
-                'reservation_timestamp': None,  # Not in DB, can be added if needed
-                'route_origin': route_origin.strip(),
-                'route_destination': route_destination.strip(),
-                'reservation_type': service,
-                'num_passengers': passengers,
-                'travel_date': None,  # Not in DB, can be added if needed
-                'pickup_time': None,  # Not in DB, can be added if needed
-                'pickup_address': None,  # Not in DB, can be added if needed
-                'dropoff_address': None,  # Not in DB, can be added if needed
-                'flight_details': None,  # Not in DB, can be added if needed
-                'notes': None,  # Not in DB, can be added if needed
-                'cancellation_reason': None,  # Not in DB, can be added if needed
-                'price': total_cost,
-                'status': status
-            }
-            reservations.append(reservation)
-
-        return jsonify(reservations)
+        with read_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA table_info(reservations)")
+            columns = [col[1] for col in cursor.fetchall()]
+            if 'pnr' not in columns:
+                return jsonify({'reservations': [], 'error': 'Database schema mismatch: missing pnr column'})
+            cursor.execute(LIST_RESERVATIONS)
+            reservations_raw = cursor.fetchall()
+
+        if request.args.get('format') == 'columnar':
+            return fast_jsonify(reservation_columns(reservations_raw))
+        return fast_jsonify(reservation_records(reservations_raw))
     except Exception as e:
         import traceback
         error_msg = traceback.format_exc()
         app.logger.error(f"Error in get_reservations: {error_msg}")
         return jsonify({'reservations': [], 'error': str(e)})
 
+@app.route('/api/reports', methods=['GET'])
+def get_reports():
+    try:
+        with read_pool.connection() as conn:
+            report = summarize_status_totals(conn.execute(REPORT_STATUS_TOTALS).fetchall())
+        if replica_refresher is not None:
+            report['snapshot_refreshed_at'] = replica_refresher.last_refresh
+        return jsonify(report)
+    except Exception as e:
+        import traceback
+        error_msg = traceback.format_exc()
+        app.logger.error(f"Error in get_reports: {error_msg}")
+        return jsonify({"error": str(e)})
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,251 @@
+"""Chunked streaming export of the reservations table to CSV or Parquet.
+
+Rows are pulled from an SQLite cursor with ``fetchmany`` and encoded one chunk
+at a time, so memory use depends on ``chunk_size`` rather than on the number
+of reservations. The generators here back both the ``/reservations/export``
+endpoint in chatbot.py and the command line below.
+
+Usage:
+    python reservations_export.py out.csv --start-date 2025-06-01 --status confirmed
+    python reservations_export.py out.parquet --format parquet
+"""
+import argparse
+import csv
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+DB_PATH = os.path.join(BASE_DIR, 'database', 'reservations.db')
+
+EXPORT_COLUMNS = [
+    'pnr', 'name', 'service', 'route', 'passengers', 'phone', 'address_pickup',
+    'address_dropoff', 'flight', 'pickup_time', 'pickup_date', 'vehicle',
+    'total_cost', 'status'
+]
+INTEGER_COLUMNS = ('passengers', 'total_cost')
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+DEFAULT_CHUNK_SIZE = 5000
+
+def build_export_query(start_date=None, end_date=None, statuses=None, service=None, route=None):
+    query = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM reservations"
+    clauses = []
+    params = []
+    if service:
+        clauses.append("service = ?")
+        params.append(service.lower())
+    if route:
+        clauses.append("route = ?")
+        params.append(route.lower())
+    if start_date:
+        clauses.append("pickup_date >= ?")
+        params.append(start_date)
+    if end_date:
+        clauses.append("pickup_date <= ?")
+        params.append(end_date)
+    if statuses:
+        clauses.append(f"status IN ({', '.join('?' for _ in statuses)})")
+        params.extend(statuses)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    return query, params
+
+def _open_snapshot(db_path):
+    """Open a read-only connection whose reads never block booking commits.
+
+    In WAL mode a reader works from its own snapshot, so the database is read
+    directly. In any other journal mode a held read lock would make commits
+    fail with "database is locked" for as long as a download runs, so the
+    database is first copied with the backup API (one short read) and the copy
+    is read instead. Returns ``(conn, path_to_remove_or_None)``.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    if conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == 'wal':
+        return conn, None
+    fd, snapshot_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        snapshot = sqlite3.connect(snapshot_path)
+        try:
+            conn.backup(snapshot)
+        finally:
+            snapshot.close()
+        conn.close()
+        return sqlite3.connect(f"file:{snapshot_path}?mode=ro", uri=True), snapshot_path
+    except BaseException:
+        conn.close()
+        os.remove(snapshot_path)
+        raise
+
+class ReservationChunks:
+    """Row chunks of an export query over one snapshot connection.
+
+    ``execute`` runs the query up front; iterating then fetches up to
+    ``chunk_size`` rows at a time and closes the snapshot at the end.
+    ``close`` releases it early, e.g. when a client disconnects before the
+    download starts.
+    """
+
+    def __init__(self, conn, snapshot_path=None):
+        self._conn = conn
+        self._snapshot_path = snapshot_path
+        self._cursor = None
+        self.chunk_size = DEFAULT_CHUNK_SIZE
+
+    def execute(self, query, params, chunk_size):
+        self.chunk_size = chunk_size
+        self._cursor = self._conn.cursor()
+        self._cursor.arraysize = chunk_size
+        self._cursor.execute(query, params)
+
+    def __iter__(self):
+        try:
+            while True:
+                rows = self._cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            self.close()
+
+    def close(self):
+        if self._conn is None:
+            return
+        self._conn.close()
+        self._conn = None
+        if self._snapshot_path is not None:
+            os.remove(self._snapshot_path)
+
+def iter_reservation_chunks(db_path=DB_PATH, start_date=None, end_date=None, statuses=None,
+                            chunk_size=DEFAULT_CHUNK_SIZE, service=None, route=None):
+    """Return the ``ReservationChunks`` of an export over one consistent snapshot.
+
+    The snapshot is opened and the query executed before this returns, so a
+    missing database or a bad query raises here rather than partway through
+    a download.
+    """
+    query, params = build_export_query(start_date, end_date, statuses, service, route)
+    chunks = ReservationChunks(*_open_snapshot(db_path))
+    try:
+        chunks.execute(query, params, chunk_size)
+    except BaseException:
+        chunks.close()
+        raise
+    return chunks
+
+def stream_csv(chunks):
+    """Encode row chunks as CSV, yielding one UTF-8 block per chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose contents are handed out as they arrive."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+def _parquet_schema(pa):
+    return pa.schema([
+        (c, pa.int64() if c in INTEGER_COLUMNS else pa.string())
+        for c in EXPORT_COLUMNS
+    ])
+
+def stream_parquet(chunks):
+    """Encode row chunks as Parquet, one row group per chunk.
+
+    Requires pyarrow. Bytes are yielded as each row group is flushed and the
+    footer is emitted last, so the output can be sent over a socket without
+    building the file in memory first.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(pa)
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            table = pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema)
+            writer.write_table(table)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def stream_export(fmt, chunks):
+    if fmt == 'csv':
+        return stream_csv(chunks)
+    if fmt == 'parquet':
+        return stream_parquet(chunks)
+    raise ValueError(f"Unsupported export format: {fmt}")
+
+def parse_statuses(value):
+    if not value:
+        return None
+    return [s.strip().lower() for s in value.split(',') if s.strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export reservations to CSV or Parquet')
+    parser.add_argument('output', help="output file, or '-' for stdout")
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), help='defaults to the output file extension')
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--start-date', help='first pickup_date to include (YYYY-MM-DD)')
+    parser.add_argument('--end-date', help='last pickup_date to include (YYYY-MM-DD)')
+    parser.add_argument('--status', help='comma-separated statuses, e.g. pending,confirmed')
+    parser.add_argument('--service', help='e.g. reguler')
+    parser.add_argument('--route', help='e.g. malang-juanda')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip('.').lower() or 'csv'
+    if fmt not in EXPORT_FORMATS:
+        parser.error(f"unsupported format: {fmt}")
+
+    chunks = iter_reservation_chunks(args.db, args.start_date, args.end_date,
+                                     parse_statuses(args.status), args.chunk_size, args.service, args.route)
+    out = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        for block in stream_export(fmt, chunks):
+            out.write(block)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+if __name__ == '__main__':
+    main()
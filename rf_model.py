@@ -0,0 +1,125 @@
+"""Random-forest scoring for /rf/predict and scripts/score_reservations.py.
+
+Models are loaded once per worker and kept in memory by ``ModelCache``; with
+hot reload on, the file's mtime is checked at most every ``check_interval``
+seconds and a changed model is swapped in without a restart. Feature rows are
+built from reservation columns into a single NumPy matrix so a whole day of
+reservations is scored with one ``predict_proba`` call. NumPy is imported
+on first use, so the app starts without it when /rf/predict is not used.
+"""
+import logging
+import os
+import pickle
+import threading
+import time
+
+ROUTES = ['malang-juanda', 'juanda-malang', 'malang-surabaya', 'surabaya-malang']
+SERVICES = ['reguler', 'charter_drop', 'charter_harian']
+FEATURE_NAMES = (
+    [f'route={r}' for r in ROUTES] + [f'service={s}' for s in SERVICES] +
+    ['passengers', 'pickup_hour', 'pickup_weekday', 'pickup_month', 'pickup_day']
+)
+
+def _normalize(value):
+    return (value or '').strip().lower().replace(' ', '_')
+
+def _pickup_hour(pickup_time):
+    try:
+        return int(str(pickup_time).split(':')[0])
+    except (TypeError, ValueError):
+        return -1
+
+def _pickup_dates(values):
+    import numpy as np
+
+    dates = np.empty(len(values), dtype='datetime64[D]')
+    for i, value in enumerate(values):
+        try:
+            dates[i] = np.datetime64(value, 'D') if value else np.datetime64('NaT')
+        except ValueError:
+            dates[i] = np.datetime64('NaT')
+    return dates
+
+def build_features(records):
+    """Return an ``(n, len(FEATURE_NAMES))`` float matrix for reservation dicts.
+
+    Each record needs route, service, passengers, pickup_time and pickup_date;
+    unknown categories get all-zero one-hot columns and unparseable times or
+    dates become -1.
+    """
+    import numpy as np
+
+    routes = np.array([_normalize(r.get('route')) for r in records], dtype=object)
+    services = np.array([_normalize(r.get('service')) for r in records], dtype=object)
+    route_onehot = (routes[:, None] == np.array(ROUTES, dtype=object)[None, :])
+    service_onehot = (services[:, None] == np.array(SERVICES, dtype=object)[None, :])
+
+    passengers = np.array([r.get('passengers') or 0 for r in records], dtype=float)
+    hours = np.array([_pickup_hour(r.get('pickup_time')) for r in records], dtype=float)
+
+    dates = _pickup_dates([r.get('pickup_date') for r in records])
+    missing = np.isnat(dates)
+    days = dates.astype('int64')
+    # 1970-01-01 was a Thursday; shift so Monday is 0
+    weekday = np.where(missing, -1, (days + 3) % 7)
+    month = np.where(missing, -1, dates.astype('datetime64[M]').astype('int64') % 12 + 1)
+    day = np.where(missing, -1, (dates - dates.astype('datetime64[M]')).astype('int64') + 1)
+
+    return np.column_stack([
+        route_onehot, service_onehot, passengers, hours, weekday, month, day
+    ]).astype(np.float64)
+
+def _load(path):
+    try:
+        import joblib
+    except ImportError:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    return joblib.load(path)
+
+class ModelCache:
+    def __init__(self, path, hot_reload=False, check_interval=5.0):
+        self.path = path
+        self.hot_reload = hot_reload
+        self.check_interval = check_interval
+        self._model = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        now = time.monotonic()
+        if self._model is not None and (not self.hot_reload or now - self._checked_at < self.check_interval):
+            return self._model
+        with self._lock:
+            self._checked_at = now
+            if self._model is None:
+                self._mtime = os.path.getmtime(self.path)
+                self._model = _load(self.path)
+                return self._model
+            try:
+                mtime = os.path.getmtime(self.path)
+                if mtime != self._mtime:
+                    # Load first, then swap, so requests keep the old model meanwhile
+                    model = _load(self.path)
+                    self._model, self._mtime = model, mtime
+            except Exception as e:
+                # A half-copied or corrupt file must not take scoring down;
+                # keep serving the loaded model and retry on the next check.
+                logging.getLogger(__name__).error(f"Reloading model {self.path} failed, keeping the loaded one: {e}")
+            return self._model
+
+    def predict(self, features):
+        """Score a feature matrix; probability of the positive class when available."""
+        model = self.get()
+        if hasattr(model, 'predict_proba'):
+            return model.predict_proba(features)[:, -1]
+        return model.predict(features)
+
+def parse_model_paths(spec, base_dir):
+    """Parse ``'noshow=models/noshow.joblib,demand=models/demand.joblib'``."""
+    paths = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, path = item.partition('=')
+        paths[name.strip()] = path if os.path.isabs(path) else os.path.join(base_dir, path)
+    return paths
@@ -0,0 +1,377 @@
+"""Streaming analytics over chatbot.log.
+
+Reads the ``User {user_id} sent: {message}`` lines written by chatbot.py in a
+single pass over an mmap of the file, replays each user's messages through the
+booking flow and reports intent mix, step drop-off and the most common
+unrecognized messages. Memory stays flat in the size of the log: only per-user
+flow state and a bounded heavy-hitters table are kept.
+
+Usage:
+    python scripts/analyze_chatbot_log.py chatbot.log --top 20 --workers 4
+"""
+import argparse
+import json
+import mmap
+import os
+import re
+import sys
+import zlib
+from collections import Counter, OrderedDict
+from multiprocessing import Pool
+
+LINE_RE = re.compile(rb'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\d+ - \w+ - User (.+?) sent: (.*)$')
+
+# Keyword lists mirror process_input() / chat() in chatbot.py
+BOOKING_KEYWORDS = ['pesan', 'booking', 'reservasi']
+RECOMMEND_KEYWORDS = ['rekomendasi', 'recommend', 'saran']
+INTENT_KEYWORDS = [
+    ('booking', BOOKING_KEYWORDS),
+    ('check_reservation', ['cek', 'cari', 'status']),
+    ('get_price', ['harga', 'price']),
+    ('recommend_service', RECOMMEND_KEYWORDS),
+    ('thank_you', ['terima kasih', 'makasih', 'thanks']),
+    ('greet', ['halo', 'hai', 'selamat']),
+]
+# Messages chat() answers outside the booking flow; anything else falls
+# through to the "Maaf, saya kurang paham" reply
+ANSWERED_KEYWORDS = ['bantuan', 'help', 'rekomendasi', 'suggest', 'terima kasih', 'makasih',
+                     'thanks', 'selamat', 'halo', 'hai']
+
+BOOKING_RE = re.compile(r'(reguler|charter drop|charter harian|charter dropp|regulerr|charter hariann)\s*(malang-juanda|juanda-malang|malang-surabaya|surabaya-malang|malang-juandaa|juanda-malangg)')
+NAME_RE = re.compile(r'[A-Za-z\s]{3,50}')
+PHONE_RE = re.compile(r'^\+628[0-9]{8,12}$')
+TIME_RE = re.compile(r'^\d{2}:\d{2}$')
+DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+PNR_RE = re.compile(r'^(KIR|KR)-[A-Z0-9]{4,6}$')
+PASSENGER_WORDS = {
+    'satu': 1, 'dua': 2, 'tiga': 3, 'empat': 4, 'lima': 5, 'enam': 6, 'tujuh': 7,
+    'delapan': 8, 'sembilan': 9, 'sepuluh': 10
+}
+
+# Booking steps in the order a reservation passes through them
+FUNNEL_STEPS = [
+    'started', 'vehicle_type', 'name', 'passengers', 'phone', 'address_pickup',
+    'rental_hours', 'address_dropoff', 'flight', 'airline', 'pickup_time',
+    'pickup_date', 'summary', 'confirmed'
+]
+MAX_MESSAGE_LEN = 200
+
+def detect_intent(message_lower):
+    for intent, keywords in INTENT_KEYWORDS:
+        if any(x in message_lower for x in keywords):
+            return intent
+    return 'unknown'
+
+def _valid_passengers(message_lower):
+    match = re.match(r'(\d+|\w+)\s*(penumpang|orang)?', message_lower.strip())
+    if not match:
+        return False
+    num = match.group(1)
+    num = int(num) if num.isdigit() else PASSENGER_WORDS.get(num)
+    return num is not None and 1 <= num <= 10
+
+def _valid_phone(message):
+    phone = re.sub(r'\s+', '', message)
+    if phone.startswith('08'):
+        phone = '+62' + phone[1:]
+    elif not phone.startswith('+62'):
+        phone = '+62' + phone.lstrip('0')
+    return bool(PHONE_RE.match(phone))
+
+class SpaceSaving:
+    """Bounded top-N counter (Metwally et al. space-saving algorithm)."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+
+    def add(self, key, count=1):
+        if key in self.counts:
+            self.counts[key] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = count
+        else:
+            victim = min(self.counts, key=self.counts.get)
+            self.counts[key] = self.counts.pop(victim) + count
+
+    def merge(self, other):
+        for key, count in other.counts.items():
+            self.add(key, count)
+
+    def top(self, n):
+        return Counter(self.counts).most_common(n)
+
+class UserFlow:
+    """Replays one user's messages through the step machine in chat()."""
+
+    __slots__ = ('step', 'service', 'error_count', 'furthest')
+
+    def __init__(self):
+        self.step = None
+        self.service = None
+        self.error_count = 0
+        self.furthest = None
+
+class LogStats:
+    def __init__(self, top_capacity=1000):
+        self.lines = 0
+        self.messages = 0
+        self.users = {}
+        self.intents = Counter()
+        self.reached = Counter()
+        self.drop_off = Counter()
+        self.outcomes = Counter()
+        self.unrecognized = SpaceSaving(top_capacity)
+
+    # -- session bookkeeping -------------------------------------------------
+    def _advance(self, flow, step):
+        flow.step = step
+        flow.error_count = 0
+        if step in FUNNEL_STEPS:
+            self.reached[step] += 1
+            flow.furthest = step
+
+    def _end_session(self, flow, outcome):
+        if flow.furthest is not None:
+            self.outcomes[outcome] += 1
+            if outcome != 'confirmed':
+                self.drop_off[flow.furthest] += 1
+        flow.furthest = None
+
+    def _start_session(self, flow, service):
+        self._end_session(flow, 'restarted')
+        flow.service = service
+        self.reached['started'] += 1
+        flow.furthest = 'started'
+        self._advance(flow, 'vehicle_type' if service in ('charter drop', 'charter harian') else 'name')
+
+    def _fail(self, flow):
+        flow.error_count += 1
+        if flow.error_count > 2:
+            flow.step = None
+            self._end_session(flow, 'too_many_errors')
+
+    # -- replay --------------------------------------------------------------
+    def feed(self, user_id, message):
+        self.messages += 1
+        flow = self.users.get(user_id)
+        if flow is None:
+            flow = self.users[user_id] = UserFlow()
+        message = message.strip()
+        message_lower = message.lower()
+        intent = detect_intent(message_lower)
+        self.intents[intent] += 1
+
+        # Same order as chat(): a booking request, then a recommendation
+        # (answered at any step), then the current step
+        if any(x in message_lower for x in BOOKING_KEYWORDS):
+            match = BOOKING_RE.search(message_lower)
+            if match:
+                self._start_session(flow, match.group(1))
+                return
+        elif any(x in message_lower for x in RECOMMEND_KEYWORDS):
+            return
+
+        step = flow.step
+        if step == 'name':
+            if NAME_RE.match(message):
+                self._advance(flow, 'passengers')
+            else:
+                self._fail(flow)
+        elif step == 'passengers':
+            if _valid_passengers(message_lower):
+                self._advance(flow, 'phone')
+            else:
+                self._fail(flow)
+        elif step == 'phone':
+            if _valid_phone(message):
+                self._advance(flow, 'address_pickup')
+            else:
+                self._fail(flow)
+        elif step == 'address_pickup':
+            if len(message) > 5:
+                self._advance(flow, 'rental_hours' if flow.service == 'charter harian' else 'address_dropoff')
+            else:
+                self._fail(flow)
+        elif step == 'address_dropoff':
+            self._advance(flow, 'pickup_time' if flow.service == 'charter harian' else 'flight')
+        elif step == 'flight':
+            self._advance(flow, 'airline')
+        elif step == 'airline':
+            self._advance(flow, 'pickup_time')
+        elif step == 'pickup_time':
+            if TIME_RE.match(message):
+                self._advance(flow, 'pickup_date')
+            else:
+                self._fail(flow)
+        elif step == 'pickup_date':
+            if DATE_RE.match(message):
+                self._advance(flow, 'summary')
+            else:
+                self._fail(flow)
+        elif step == 'summary':
+            if message_lower in ['konfirmasi', 'confirm', 'confirmed']:
+                self.reached['confirmed'] += 1
+                flow.furthest = 'confirmed'
+                self._end_session(flow, 'confirmed')
+                flow.step = 'next_action'
+            elif message_lower == 'ulang':
+                self._advance(flow, 'name')
+            elif message_lower == 'batal':
+                flow.step = None
+                self._end_session(flow, 'cancelled')
+        elif step == 'next_action':
+            if message_lower == 'selesai':
+                flow.step = None
+            elif message_lower == 'buatkan reservasi lagi':
+                flow.service = flow.service or 'reguler'
+                self.reached['started'] += 1
+                flow.furthest = 'started'
+                self._advance(flow, 'name')
+            elif message_lower == 'cari pesanan':
+                flow.step = 'check_reservation'
+        elif step == 'check_reservation':
+            if PNR_RE.match(message):
+                flow.step = 'next_action'
+            elif message_lower in ['batal', 'tidak ada', 'ga ada']:
+                flow.step = None
+        elif not any(x in message_lower for x in ANSWERED_KEYWORDS):
+            self.unrecognized.add(message_lower[:MAX_MESSAGE_LEN])
+
+    def finish(self):
+        for flow in self.users.values():
+            self._end_session(flow, 'abandoned')
+
+    def merge(self, other):
+        self.lines += other.lines
+        self.messages += other.messages
+        self.intents.update(other.intents)
+        self.reached.update(other.reached)
+        self.drop_off.update(other.drop_off)
+        self.outcomes.update(other.outcomes)
+        self.unrecognized.merge(other.unrecognized)
+        self.users.update(other.users)
+
+    def report(self, top_n=20):
+        return {
+            'lines': self.lines,
+            'messages': self.messages,
+            'users': len(self.users),
+            'intent_mix': dict(self.intents.most_common()),
+            'funnel': {step: self.reached[step] for step in FUNNEL_STEPS if self.reached[step]},
+            'drop_off': {step: self.drop_off[step] for step in FUNNEL_STEPS if self.drop_off[step]},
+            'outcomes': dict(self.outcomes),
+            'top_unrecognized': self.unrecognized.top(top_n),
+        }
+
+def _safe_filename(user_id):
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', user_id)[:100] or '_'
+
+class TranscriptWriter:
+    """Per-user transcript files with a bounded set of open handles.
+
+    A user's file is truncated the first time the user is seen in this run,
+    so rerunning over the same log rewrites transcripts instead of appending
+    to them. At most ``max_open`` files stay open; the least recently written
+    one is closed to make room and reopened for appending if needed again.
+    """
+
+    def __init__(self, directory, max_open=128):
+        self.directory = directory
+        self.max_open = max_open
+        self._open = OrderedDict()
+        self._seen = set()
+
+    def write(self, user_id, line):
+        out = self._open.get(user_id)
+        if out is None:
+            mode = 'a' if user_id in self._seen else 'w'
+            self._seen.add(user_id)
+            out = self._open[user_id] = open(
+                os.path.join(self.directory, _safe_filename(user_id) + '.log'), mode, encoding='utf-8')
+            if len(self._open) > self.max_open:
+                self._open.popitem(last=False)[1].close()
+        else:
+            self._open.move_to_end(user_id)
+        out.write(line)
+
+    def close(self):
+        while self._open:
+            self._open.popitem()[1].close()
+
+def count_lines(mm, block_size=1 << 20):
+    lines = 0
+    for offset in range(0, len(mm), block_size):
+        lines += mm[offset:offset + block_size].count(b'\n')
+    return lines
+
+def iter_messages(mm):
+    """Yield ``(timestamp, user_id, message)`` for each chat line in ``mm``."""
+    start = 0
+    size = len(mm)
+    while start < size:
+        end = mm.find(b'\n', start)
+        if end == -1:
+            end = size
+        # Cheap byte check before running the regex on every log line
+        if mm.find(b' sent: ', start, end) != -1:
+            match = LINE_RE.match(mm[start:end].rstrip(b'\r'))
+            if match:
+                yield (match.group(1).decode(),
+                       match.group(2).decode('utf-8', 'replace'),
+                       match.group(3).decode('utf-8', 'replace'))
+        start = end + 1
+
+def analyze(path, shard=0, shards=1, top_capacity=1000, conversations_dir=None):
+    stats = LogStats(top_capacity)
+    if os.path.getsize(path) == 0:
+        return stats
+    # Shards hold disjoint users, so each transcript has a single writer
+    transcripts = TranscriptWriter(conversations_dir) if conversations_dir else None
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            stats.lines = count_lines(mm) if shard == 0 else 0
+            for timestamp, user_id, message in iter_messages(mm):
+                if shards > 1 and zlib.crc32(user_id.encode()) % shards != shard:
+                    continue
+                stats.feed(user_id, message)
+                if transcripts is not None:
+                    transcripts.write(user_id, f"{timestamp}\t{message}\n")
+    finally:
+        if transcripts is not None:
+            transcripts.close()
+    stats.finish()
+    return stats
+
+def _analyze_shard(args):
+    return analyze(*args)
+
+def run(path, workers=1, top_capacity=1000, conversations_dir=None):
+    if conversations_dir:
+        os.makedirs(conversations_dir, exist_ok=True)
+    if workers <= 1:
+        return analyze(path, 0, 1, top_capacity, conversations_dir)
+    # Each worker replays a disjoint set of users so every conversation is
+    # seen in order by exactly one process.
+    jobs = [(path, shard, workers, top_capacity, conversations_dir) for shard in range(workers)]
+    with Pool(workers) as pool:
+        results = pool.map(_analyze_shard, jobs)
+    stats = results[0]
+    for other in results[1:]:
+        stats.merge(other)
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Streaming analytics over chatbot.log')
+    parser.add_argument('log', nargs='?', default='chatbot.log')
+    parser.add_argument('--top', type=int, default=20, help='number of unrecognized messages to report')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--conversations', metavar='DIR', help='write one transcript file per user to DIR')
+    args = parser.parse_args(argv)
+
+    stats = run(args.log, args.workers, max(args.top * 50, 1000), args.conversations)
+    json.dump(stats.report(args.top), sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write('\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark /reservations/ serialization at 100k rows.
+
+Compares the stdlib encoder Flask's jsonify uses with the fast path in
+serialization.py, for the record and columnar formats, and reports bytes on
+the wire with and without compression.
+
+Usage:
+    python scripts/benchmark_serialization.py --rows 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.queries import reservation_columns, reservation_records
+from serialization import available_encodings, compress, dumps, orjson
+
+def sample_rows(n):
+    random.seed(0)
+    routes = ["malang-juanda", "juanda-malang", "malang-surabaya", "surabaya-malang"]
+    services = ["reguler", "charter_drop", "charter_harian"]
+    statuses = ["pending", "confirmed", "cancelled"]
+    return [
+        (f"KR-{i:06X}", "Budi Santoso", random.choice(services), random.choice(routes), random.randint(1, 5),
+         random.choice([180000, 205000, 395000]), random.choice(statuses),
+         f"2025-{random.randint(6, 12):02d}-{random.randint(1, 28):02d}", f"{random.randint(0, 23):02d}:00",
+         f"Jl. Contoh No. {random.randint(1, 100)}", f"Jl. Tujuan No. {random.randint(1, 100)}")
+        for i in range(n)
+    ]
+
+def flask_default_dumps(obj):
+    # Equivalent of Flask's DefaultJSONProvider outside debug mode
+    return json.dumps(obj, ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    rows = sample_rows(args.rows)
+    cases = [
+        ('jsonify (stdlib), records', lambda: flask_default_dumps(reservation_records(rows))),
+        ('fast dumps, records', lambda: dumps(reservation_records(rows))),
+        ('fast dumps, columnar', lambda: dumps(reservation_columns(rows))),
+    ]
+    print(f"{args.rows} rows, encoder: {'orjson' if orjson is not None else 'stdlib json'}")
+    print(f"{'case':<28} {'build+encode ms':>16} {'identity bytes':>15}" +
+          ''.join(f" {enc + ' bytes':>12} {enc + ' ms':>8}" for enc in available_encodings()))
+    for name, fn in cases:
+        elapsed, body = best_of(fn, args.repeat)
+        line = f"{name:<28} {elapsed * 1000:>16.1f} {len(body):>15,}"
+        for encoding in available_encodings():
+            compress_time, compressed = best_of(lambda: compress(body, encoding), 1)
+            line += f" {len(compressed):>12,} {compress_time * 1000:>8.1f}"
+        print(line)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Score the reservations table with one or more random-forest models.
+
+Reservations are read in fixed-size chunks; each chunk becomes one feature
+matrix and one predict call per model. Output is CSV with one score column
+per model.
+
+Usage:
+    python scripts/score_reservations.py scores.csv --models noshow=models/noshow.joblib --start-date 2025-06-20
+"""
+import argparse
+import csv
+import os
+import sys
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+
+from reservations_export import DB_PATH, DEFAULT_CHUNK_SIZE, EXPORT_COLUMNS, iter_reservation_chunks, parse_statuses
+from rf_model import ModelCache, build_features, parse_model_paths
+
+def score_chunks(chunks, models):
+    """Yield ``(rows, {model_name: scores})`` for each chunk of reservation rows."""
+    for rows in chunks:
+        features = build_features([dict(zip(EXPORT_COLUMNS, row)) for row in rows])
+        yield rows, {name: model.predict(features) for name, model in models.items()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score reservations with random-forest models')
+    parser.add_argument('output', help="output CSV file, or '-' for stdout")
+    parser.add_argument('--models', default='default=models/random_forest.joblib',
+                        help="comma-separated name=path pairs, relative to the repository root")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--start-date', help='first pickup_date to score (YYYY-MM-DD)')
+    parser.add_argument('--end-date', help='last pickup_date to score (YYYY-MM-DD)')
+    parser.add_argument('--status', help='comma-separated statuses, e.g. pending,confirmed')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    models = {name: ModelCache(path) for name, path in parse_model_paths(args.models, BASE_DIR).items()}
+    chunks = iter_reservation_chunks(args.db, args.start_date, args.end_date,
+                                     parse_statuses(args.status), args.chunk_size)
+    pnr_index = EXPORT_COLUMNS.index('pnr')
+    date_index = EXPORT_COLUMNS.index('pickup_date')
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        writer = csv.writer(out)
+        writer.writerow(['pnr', 'pickup_date'] + list(models))
+        scored = 0
+        for rows, scores in score_chunks(chunks, models):
+            columns = [scores[name] for name in models]
+            writer.writerows(
+                [row[pnr_index], row[date_index]] + [float(c[i]) for c in columns]
+                for i, row in enumerate(rows)
+            )
+            scored += len(rows)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Scored {scored} reservations.", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""JSON encoding and response compression for large list endpoints.
+
+``dumps`` uses orjson when it is installed and falls back to the standard
+library otherwise. ``encode_response`` negotiates brotli or gzip from the
+request's Accept-Encoding header and only compresses bodies above
+``MIN_COMPRESS_SIZE``, since small payloads gain nothing from it.
+"""
+import gzip
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+def dumps(obj):
+    """Serialize ``obj`` to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def available_encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+def choose_encoding(accept_encoding):
+    """Pick the preferred supported content coding from an Accept-Encoding value."""
+    if not accept_encoding:
+        return None
+    offered = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        offered[coding.strip().lower()] = quality
+    best = None
+    for coding in available_encodings():
+        quality = offered.get(coding, offered.get('*', 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (coding, quality)
+    return best[0] if best else None
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+def encode_response(payload, accept_encoding=None, min_size=MIN_COMPRESS_SIZE):
+    """Return ``(body, headers)`` for a JSON response carrying ``payload``."""
+    body = dumps(payload)
+    headers = {'Content-Type': 'application/json', 'Vary': 'Accept-Encoding'}
+    if len(body) >= min_size:
+        encoding = choose_encoding(accept_encoding)
+        if encoding:
+            body = compress(body, encoding)
+            headers['Content-Encoding'] = encoding
+    return body, headers
+
+def fast_jsonify(payload, status=200):
+    """Drop-in for ``jsonify`` on large payloads inside a Flask request."""
+    from flask import Response, request
+
+    body, headers = encode_response(payload, request.headers.get('Accept-Encoding'))
+    return Response(body, status=status, headers=headers)
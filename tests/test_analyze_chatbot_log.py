@@ -0,0 +1,94 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.analyze_chatbot_log import run, SpaceSaving, TranscriptWriter
+
+BOOKING_MESSAGES = [
+    'Pesan Reguler Malang-Juanda', 'Budi Santoso', '3 penumpang', '08123456789',
+    'Jl. Kawi No. 10', 'tidak ada', 'GA123', 'Garuda Indonesia', '07:00',
+    '2025-06-20', 'konfirmasi',
+]
+
+def write_log(path, entries):
+    with open(path, 'w') as f:
+        f.write("2025-06-08 21:00:00,000 - INFO -  * Debugger is active!\n")
+        for i, (user_id, message) in enumerate(entries):
+            f.write(f"2025-06-08 21:{i // 60:02d}:{i % 60:02d},123 - INFO - User {user_id} sent: {message}\n")
+            f.write(f"2025-06-08 21:{i // 60:02d}:{i % 60:02d},124 - INFO - 127.0.0.1 - - \"POST /chat HTTP/1.1\" 200 -\n")
+
+def test_funnel_and_drop_off(tmp_path):
+    log_path = tmp_path / 'chatbot.log'
+    entries = [('alice', m) for m in BOOKING_MESSAGES]
+    entries += [('bob', m) for m in BOOKING_MESSAGES[:4]]
+    entries += [('carol', 'asdf'), ('carol', 'asdf'), ('carol', 'halo')]
+    write_log(log_path, entries)
+
+    report = run(str(log_path)).report()
+    assert report['messages'] == len(entries)
+    assert report['users'] == 3
+    assert report['funnel']['started'] == 2
+    assert report['funnel']['confirmed'] == 1
+    assert report['drop_off'] == {'address_pickup': 1}
+    assert report['outcomes'] == {'confirmed': 1, 'abandoned': 1}
+    assert report['intent_mix']['greet'] == 1
+    assert report['top_unrecognized'] == [('asdf', 2)]
+
+def test_workers_match_single_process(tmp_path):
+    log_path = tmp_path / 'chatbot.log'
+    entries = [(f'user{n}', m) for n in range(5) for m in BOOKING_MESSAGES[:n + 3]]
+    write_log(log_path, entries)
+
+    single = run(str(log_path)).report()
+    sharded = run(str(log_path), workers=3).report()
+    assert sharded == single
+
+def test_conversations_written_per_user(tmp_path):
+    log_path = tmp_path / 'chatbot.log'
+    write_log(log_path, [('alice', 'halo'), ('bob', 'hai'), ('alice', 'bantuan')])
+    out_dir = tmp_path / 'conversations'
+
+    run(str(log_path), conversations_dir=str(out_dir))
+    lines = (out_dir / 'alice.log').read_text().splitlines()
+    assert [line.split('\t')[1] for line in lines] == ['halo', 'bantuan']
+
+def test_conversations_are_rewritten_on_rerun(tmp_path):
+    log_path = tmp_path / 'chatbot.log'
+    write_log(log_path, [('alice', 'halo'), ('bob', 'hai')])
+    out_dir = tmp_path / 'conversations'
+
+    run(str(log_path), conversations_dir=str(out_dir))
+    run(str(log_path), workers=2, conversations_dir=str(out_dir))
+    assert len((out_dir / 'alice.log').read_text().splitlines()) == 1
+
+def test_transcript_writer_bounds_open_files(tmp_path):
+    writer = TranscriptWriter(str(tmp_path), max_open=2)
+    for user_id in ['a', 'b', 'c', 'a']:
+        writer.write(user_id, f"{user_id}\n")
+    assert len(writer._open) == 2
+    writer.close()
+    assert (tmp_path / 'a.log').read_text() == 'a\na\n'
+
+def test_misspelled_charter_goes_to_name_step(tmp_path):
+    log_path = tmp_path / 'chatbot.log'
+    write_log(log_path, [('dina', 'Pesan Charter Dropp Malang-Juanda'), ('dina', 'Dina Lestari')])
+
+    report = run(str(log_path)).report()
+    assert 'vehicle_type' not in report['funnel']
+    assert report['funnel']['passengers'] == 1
+
+def test_recommendation_does_not_advance_step(tmp_path):
+    log_path = tmp_path / 'chatbot.log'
+    write_log(log_path, [('eko', 'Pesan Reguler Malang-Juanda'), ('eko', 'cari rekomendasi')])
+
+    report = run(str(log_path)).report()
+    assert report['intent_mix']['check_reservation'] == 1
+    assert 'passengers' not in report['funnel']
+
+def test_space_saving_keeps_heavy_hitters():
+    counter = SpaceSaving(3)
+    for key in ['a'] * 10 + ['b'] * 5 + list('cdefg'):
+        counter.add(key)
+    assert counter.top(2)[0] == ('a', 10)
+    assert len(counter.counts) == 3
@@ -4,10 +4,17 @@ import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import chatbot
 from chatbot import app, calculate_cost
 
 @pytest.fixture
-def client():
+def client(tmp_path, monkeypatch):
+    # Bookings go to a throwaway database, not the tracked reservations.db
+    monkeypatch.setattr(chatbot, 'DB_PATH', str(tmp_path / 'reservations.db'))
+    # Every test starts with full rate-limit buckets
+    store = chatbot.MemoryBucketStore()
+    monkeypatch.setattr(chatbot.user_rate_limiter, 'store', store)
+    monkeypatch.setattr(chatbot.ip_rate_limiter, 'store', store)
     app.config['TESTING'] = True
     with app.test_client() as client:
         yield client
@@ -78,3 +85,157 @@ def test_reservation_search(client):
     assert ('Silakan masukkan kode booking' in response.json['response'] or
             'Detail pesanan' in response.json['response'] or
             'Apa yang ingin dilakukan selanjutnya' in response.json['response'])
+
+def test_chat_rate_limited_per_user(client, monkeypatch):
+    monkeypatch.setattr(chatbot.user_rate_limiter, 'burst', 2)
+    monkeypatch.setattr(chatbot.user_rate_limiter, 'rate', 0.01)
+    for _ in range(2):
+        response = client.post('/chat', json={'message': 'halo', 'user_id': 'flood_user'})
+        assert response.status_code == 200
+    response = client.post('/chat', json={'message': 'halo', 'user_id': 'flood_user'})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert 'coba lagi' in response.json['response']
+    # Other users are unaffected
+    response = client.post('/chat', json={'message': 'halo', 'user_id': 'other_user'})
+    assert response.status_code == 200
+
+def test_chat_rate_limited_per_ip_unless_trusted(client, monkeypatch):
+    monkeypatch.setattr(chatbot.ip_rate_limiter, 'burst', 1)
+    monkeypatch.setattr(chatbot.ip_rate_limiter, 'rate', 0.01)
+    assert client.post('/chat', json={'message': 'halo', 'user_id': 'ip_user_1'}).status_code == 200
+    assert client.post('/chat', json={'message': 'halo', 'user_id': 'ip_user_2'}).status_code == 429
+    # e.g. the Rasa action server, which relays every user's messages
+    monkeypatch.setattr(chatbot, 'CHAT_TRUSTED_IPS', {'127.0.0.1'})
+    assert client.post('/chat', json={'message': 'halo', 'user_id': 'ip_user_3'}).status_code == 200
+
+def test_chat_load_shedding(client, monkeypatch):
+    monkeypatch.setattr(chatbot.chat_load_shedder, 'max_in_flight', 0)
+    response = client.post('/chat', json={'message': 'halo', 'user_id': 'shed_user'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+def book_until_summary(client, user_id):
+    for msg in ['Pesan Reguler Malang-Juanda', 'Budi Santoso', '3 penumpang', '+628123456789',
+                'Jl. Kawi No. 10', 'Jl. Sudirman No. 5', 'GA123', 'Garuda Indonesia', '07:00', '2025-06-20']:
+        client.post('/chat', json={'message': msg, 'user_id': user_id})
+
+def count_reservations(pnr):
+    import sqlite3
+    conn = sqlite3.connect(chatbot.DB_PATH)
+    count = conn.execute("SELECT COUNT(*) FROM reservations WHERE pnr = ?", (pnr,)).fetchone()[0]
+    conn.close()
+    return count
+
+def test_retried_confirmation_is_replayed(client):
+    book_until_summary(client, 'retry_user')
+    headers = {'Idempotency-Key': 'msg-123'}
+    first = client.post('/chat', json={'message': 'konfirmasi', 'user_id': 'retry_user'}, headers=headers)
+    second = client.post('/chat', json={'message': 'konfirmasi', 'user_id': 'retry_user'}, headers=headers)
+    assert first.json == second.json
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    pnr = chatbot.user_states['retry_user']['booking_data']['pnr']
+    assert count_reservations(pnr) == 1
+
+def test_confirmation_without_key_is_not_duplicated(client):
+    book_until_summary(client, 'retry_user_2')
+    first = client.post('/chat', json={'message': 'konfirmasi', 'user_id': 'retry_user_2'})
+    second = client.post('/chat', json={'message': 'konfirmasi', 'user_id': 'retry_user_2'})
+    assert 'Kode Booking' in second.json['response']
+    assert first.json == second.json
+    pnr = chatbot.user_states['retry_user_2']['booking_data']['pnr']
+    assert count_reservations(pnr) == 1
+
+def test_new_booking_gets_new_pnr(client):
+    book_until_summary(client, 'repeat_user')
+    client.post('/chat', json={'message': 'konfirmasi', 'user_id': 'repeat_user'})
+    first_pnr = chatbot.user_states['repeat_user']['booking_data']['pnr']
+    book_until_summary(client, 'repeat_user')
+    response = client.post('/chat', json={'message': 'konfirmasi', 'user_id': 'repeat_user'})
+    second_pnr = chatbot.user_states['repeat_user']['booking_data']['pnr']
+    assert second_pnr != first_pnr
+    assert second_pnr in response.json['response']
+    assert count_reservations(first_pnr) == 1
+    assert count_reservations(second_pnr) == 1
+
+def test_pnr_collision_draws_new_pnr(client, monkeypatch):
+    pnrs = iter(['aaaaaa-0000', 'aaaaaa-0000', 'bbbbbb-0000'])
+    monkeypatch.setattr(chatbot.uuid, 'uuid4', lambda: next(pnrs))
+    book_until_summary(client, 'first_user')
+    client.post('/chat', json={'message': 'konfirmasi', 'user_id': 'first_user'})
+    book_until_summary(client, 'collision_user')
+    response = client.post('/chat', json={'message': 'konfirmasi', 'user_id': 'collision_user'})
+    assert 'KR-BBBBBB' in response.json['response']
+    assert count_reservations('KR-AAAAAA') == 1
+    assert count_reservations('KR-BBBBBB') == 1
+
+def test_concurrent_request_for_same_user_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(chatbot, 'CHAT_USER_LOCK_WAIT', 0.01)
+    assert chatbot.user_locks.acquire('busy_user')
+    try:
+        response = client.post('/chat', json={'message': 'halo', 'user_id': 'busy_user'})
+    finally:
+        chatbot.user_locks.release('busy_user')
+    assert response.status_code == 409
+    assert response.headers['Retry-After'] == '1'
+    # The rejected request never took a load-shedder slot
+    assert chatbot.chat_load_shedder.in_flight == 0
+
+def test_reservations_export_endpoint(client):
+    import csv
+    import io
+    from database.apply_schema import migrate
+    migrate(chatbot.DB_PATH)
+    book_until_summary(client, 'export_user')
+    client.post('/chat', json={'message': 'konfirmasi', 'user_id': 'export_user'})
+    pnr = chatbot.user_states['export_user']['booking_data']['pnr']
+    response = client.get('/reservations/export?format=csv&chunk_size=1&service=reguler')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    records = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert records[0][0] == 'pnr'
+    assert [r[0] for r in records[1:]] == [pnr]
+    assert client.get('/reservations/export?format=xlsx').status_code == 400
+
+@pytest.mark.parametrize('max_tokens', ['many', -5, 0, None])
+def test_llama_respond_rejects_invalid_max_tokens(client, max_tokens):
+    response = client.post('/llama/respond', json={'prompt': 'halo', 'max_tokens': max_tokens})
+    assert response.status_code == 400
+
+def test_reservations_export_missing_database(client):
+    response = client.get('/reservations/export')
+    assert response.status_code == 503
+    assert 'error' in response.json
+
+def test_constraint_failure_is_not_reported_as_pnr_collision(client, monkeypatch):
+    from database.apply_schema import migrate
+    migrate(chatbot.DB_PATH)
+    drawn = []
+    real_uuid4 = chatbot.uuid.uuid4
+    monkeypatch.setattr(chatbot.uuid, 'uuid4', lambda: drawn.append(1) or real_uuid4())
+    book_until_summary(client, 'null_user')
+    # total_cost is NOT NULL in the migrated schema
+    monkeypatch.setattr(chatbot, 'calculate_price', lambda *args: None)
+    response = client.post('/chat', json={'message': 'konfirmasi', 'user_id': 'null_user'})
+    assert 'gagal disimpan' in response.json['response']
+    assert len(drawn) == 1
+
+class BrokenBackend:
+    def generate_batch(self, prompts, max_tokens):
+        raise RuntimeError('model crashed')
+        yield
+
+def test_llama_respond_backend_error_is_json(client, monkeypatch):
+    monkeypatch.setattr(chatbot, 'llama_service', chatbot.LlamaService(BrokenBackend()))
+    response = client.post('/llama/respond', json={'prompt': 'halo'})
+    assert response.status_code == 503
+    assert response.json['error'] == 'Model unavailable'
+
+def test_llama_stream_reports_timeout(client, monkeypatch):
+    from llm_serving import FakeBackend
+    monkeypatch.setattr(chatbot, 'llama_service', chatbot.LlamaService(FakeBackend(step_delay=0.2)))
+    monkeypatch.setattr(chatbot, 'LLAMA_TIMEOUT', 0.01)
+    response = client.post('/llama/respond', json={'prompt': 'halo', 'stream': True})
+    assert 'event: error' in response.get_data(as_text=True)
+    response = client.post('/llama/respond', json={'prompt': 'halo lagi'})
+    assert response.status_code == 504
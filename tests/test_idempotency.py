@@ -0,0 +1,69 @@
+import threading
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from idempotency import IdempotencyCache, KeyedLocks
+
+def test_completed_response_is_replayed():
+    cache = IdempotencyCache()
+    entry, owner = cache.reserve(('u', 'k1'), now=0)
+    assert owner
+    cache.complete(('u', 'k1'), entry, 'first', now=0)
+    entry, owner = cache.reserve(('u', 'k1'), now=1)
+    assert not owner
+    assert cache.wait(entry, 0) == 'first'
+
+def test_entries_expire():
+    cache = IdempotencyCache(ttl=10)
+    entry, _ = cache.reserve('k', now=0)
+    cache.complete('k', entry, 'first', now=0)
+    assert cache.reserve('k', now=11)[1]
+
+def test_released_key_runs_again():
+    cache = IdempotencyCache()
+    entry, _ = cache.reserve('k')
+    cache.release('k', entry)
+    assert cache.reserve('k')[1]
+
+def test_cache_is_bounded():
+    cache = IdempotencyCache(max_entries=2)
+    for key in ['a', 'b', 'c']:
+        entry, _ = cache.reserve(key, now=0)
+        cache.complete(key, entry, key, now=0)
+    assert list(cache._entries) == ['b', 'c']
+
+def test_concurrent_retry_waits_for_original():
+    cache = IdempotencyCache()
+    entry, owner = cache.reserve('k')
+    results = []
+
+    def retry():
+        retry_entry, retry_owner = cache.reserve('k')
+        results.append((retry_owner, cache.wait(retry_entry, 5)))
+
+    thread = threading.Thread(target=retry)
+    thread.start()
+    cache.complete('k', entry, 'original')
+    thread.join()
+    assert results == [(False, 'original')]
+
+def test_keyed_locks_serialize_each_key():
+    locks = KeyedLocks()
+    assert locks.acquire('alice')
+    assert not locks.acquire('alice', timeout=0.01)
+    assert locks.acquire('bob', timeout=0.01)
+    locks.release('alice')
+    assert locks.acquire('alice', timeout=0.01)
+
+def test_keyed_locks_evict_idle_keys_only():
+    locks = KeyedLocks(max_idle=2)
+    assert locks.acquire('held')
+    for n in range(10):
+        assert locks.acquire(f'user{n}')
+        locks.release(f'user{n}')
+    assert len(locks) <= 3
+    # The held lock survived eviction and still excludes other callers
+    assert not locks.acquire('held', timeout=0.01)
+    locks.release('held')
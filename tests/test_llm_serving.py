@@ -0,0 +1,84 @@
+import threading
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from llm_serving import FakeBackend, LlamaService, LRUCache
+
+def run_concurrently(service, prompts, **kwargs):
+    results = [None] * len(prompts)
+    def worker(i):
+        results[i] = service.respond(prompts[i], **kwargs)
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(prompts))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+def test_respond_matches_previous_stub():
+    service = LlamaService(FakeBackend())
+    assert service.respond('Berapa harga reguler?') == 'Llama Maverick response for: Berapa harga reguler?'
+
+def test_concurrent_requests_share_batches():
+    backend = FakeBackend(step_delay=0.01)
+    service = LlamaService(backend, max_batch_size=4, max_wait=0.2, cache_size=0)
+    prompts = [f'pertanyaan {i}' for i in range(8)]
+    results = run_concurrently(service, prompts)
+    assert results == [f'Llama Maverick response for: {p}' for p in prompts]
+    assert sum(backend.batch_sizes) == 8
+    assert max(backend.batch_sizes) == 4
+    assert len(backend.batch_sizes) < 8
+
+def test_stream_yields_tokens_in_order():
+    service = LlamaService(FakeBackend())
+    tokens = list(service.stream('halo'))
+    assert tokens == ['Llama', ' Maverick', ' response', ' for:', ' halo']
+
+def test_max_tokens_is_per_request():
+    service = LlamaService(FakeBackend(), max_batch_size=2, max_wait=0.2, cache_size=0)
+    results = {}
+    def worker(max_tokens):
+        results[max_tokens] = service.respond('a b c', max_tokens=max_tokens)
+    threads = [threading.Thread(target=worker, args=(n,)) for n in (2, 256)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == {2: 'Llama Maverick', 256: 'Llama Maverick response for: a b c'}
+
+def test_repeated_prompt_is_served_from_cache():
+    backend = FakeBackend()
+    service = LlamaService(backend)
+    first = service.respond('Jam operasional?')
+    second = service.respond('  Jam   operasional? ')
+    assert first == second
+    assert len(backend.batch_sizes) == 1
+    assert service.cache.hits == 1
+
+def test_cache_keeps_the_callers_case():
+    service = LlamaService(FakeBackend())
+    service.respond('Jam operasional?')
+    assert service.respond('JAM OPERASIONAL?').endswith('JAM OPERASIONAL?')
+    assert service.cache.hits == 0
+
+def test_backend_errors_reach_the_caller():
+    class BrokenBackend:
+        def generate_batch(self, prompts, max_tokens):
+            raise RuntimeError('model crashed')
+            yield
+    service = LlamaService(BrokenBackend())
+    with pytest.raises(RuntimeError):
+        service.respond('halo', timeout=5)
+
+def test_lru_cache_evicts_least_recent():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
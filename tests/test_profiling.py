@@ -0,0 +1,83 @@
+import threading
+import time
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from profiling import RequestProfiler
+
+def busy(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        sum(range(100))
+
+def test_disabled_by_default():
+    assert not RequestProfiler().enabled
+    with pytest.raises(ValueError):
+        RequestProfiler(mode='bogus')
+
+def test_cprofile_merges_sampled_requests():
+    profiler = RequestProfiler(mode='cprofile', sample_rate=1.0)
+    for _ in range(2):
+        token = profiler.begin('POST /chat')
+        busy(0.01)
+        profiler.end(token)
+    assert profiler.profiled_requests == 2
+    assert 'busy' in profiler.cprofile_text()
+    assert profiler.cprofile_dump()
+    profiler.reset()
+    assert profiler.cprofile_dump() is None
+
+def test_only_one_cprofile_runs_at_a_time():
+    first = RequestProfiler(mode='cprofile', sample_rate=1.0)
+    second = RequestProfiler(mode='cprofile', sample_rate=1.0)
+    outer = first.begin('POST /chat')
+    inner = second.begin('POST /llama/respond')
+    assert outer.profile is not None
+    assert inner.profile is None
+    second.end(inner)
+    first.end(outer)
+    # The slot is free again once the profiled request ends
+    token = second.begin('POST /llama/respond')
+    assert token.profile is not None
+    second.end(token)
+
+def test_sample_mode_collects_collapsed_stacks():
+    profiler = RequestProfiler(mode='sample', sample_rate=1.0)
+    started = threading.Event()
+    release = threading.Event()
+
+    def handler():
+        token = profiler.begin('GET /reservations/')
+        started.set()
+        release.wait(5)
+        profiler.end(token)
+
+    thread = threading.Thread(target=handler)
+    thread.start()
+    started.wait(5)
+    profiler._sample_once()
+    profiler._sample_once()
+    release.set()
+    thread.join()
+    stacks = profiler.collapsed_stacks()
+    assert 'test_profiling.py:handler' in stacks
+    assert stacks.strip().endswith(' 2')
+
+def test_slow_requests_are_captured_once():
+    profiler = RequestProfiler(slow_ms=50)
+    assert profiler.enabled
+    token = profiler.begin('POST /chat')
+    profiler._check_slow_once(now=token.started + 0.01)
+    assert not profiler.slow_requests
+    profiler._check_slow_once(now=token.started + 0.1)
+    profiler._check_slow_once(now=token.started + 0.2)
+    profiler.end(token)
+    assert len(profiler.slow_requests) == 1
+    captured = profiler.slow_requests[0]
+    assert captured['request'] == 'POST /chat'
+    assert captured['elapsed_ms'] == 100.0
+    assert any('test_slow_requests_are_captured_once' in line for line in captured['stack'])
@@ -0,0 +1,110 @@
+import random
+import sqlite3
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.apply_schema import MIGRATIONS_DIR, get_schema_version, list_migrations, migrate
+from database.queries import REPORT_STATUS_TOTALS, RESERVATION_BY_PNR
+from reservations_export import build_export_query
+
+# Every query the apps run against reservations, with sample parameters.
+# The /reservations/ listing and the unfiltered export are left out on
+# purpose: they read every row, and a sequential table scan is the cheapest
+# way to do that.
+SEARCH_QUERIES = {
+    'lookup_by_pnr': (RESERVATION_BY_PNR, ('KR-ABC123',)),
+    'export_by_date': build_export_query('2025-06-01', '2025-06-30'),
+    'export_by_status': build_export_query(statuses=['confirmed']),
+    'export_by_status_and_date': build_export_query('2025-06-01', '2025-06-30', ['pending', 'confirmed']),
+    'export_by_service': build_export_query(service='reguler'),
+    'export_by_service_and_route': build_export_query('2025-06-01', None, None, 'reguler', 'malang-juanda'),
+    'export_by_route': build_export_query(route='malang-juanda'),
+}
+# Aggregates that read every row, but only from an index
+COVERING_SCAN_QUERIES = {
+    'report_status_totals': (REPORT_STATUS_TOTALS, ()),
+}
+
+def seed_reservations(conn, count=5000):
+    """Insert rows with a production-like mix of services, routes, dates and statuses."""
+    rng = random.Random(0)
+    rows = []
+    for i in range(count):
+        rows.append((
+            f'KR-{i:06X}', 'Budi Santoso',
+            rng.choices(['reguler', 'charter drop', 'charter harian'], [70, 20, 10])[0],
+            rng.choice(['malang-juanda', 'juanda-malang', 'malang-surabaya', 'surabaya-malang']),
+            rng.randint(1, 10), '+6281234567890', 'Jl. Kawi No. 10', None, None,
+            f'{rng.randint(0, 23):02d}:00', f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}', None,
+            180000, rng.choices(['pending', 'confirmed', 'cancelled', 'completed'], [10, 20, 5, 65])[0],
+        ))
+    conn.executemany("INSERT INTO reservations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+
+@pytest.fixture
+def conn(tmp_path):
+    db_path = str(tmp_path / 'reservations.db')
+    migrate(db_path)
+    conn = sqlite3.connect(db_path)
+    # Plans are checked with the statistics a production database has
+    seed_reservations(conn)
+    conn.execute("ANALYZE")
+    yield conn
+    conn.close()
+
+def query_plan(conn, query, params):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+
+@pytest.mark.parametrize('name', sorted(SEARCH_QUERIES))
+def test_query_plan_searches_index(conn, name):
+    query, params = SEARCH_QUERIES[name]
+    plan = query_plan(conn, query, params)
+    assert all(detail.startswith('SEARCH') for detail in plan), f"{name} scans instead of searching: {plan}"
+    assert not any('TEMP B-TREE' in detail for detail in plan), f"{name} sorts in a temp b-tree: {plan}"
+
+@pytest.mark.parametrize('name', sorted(COVERING_SCAN_QUERIES))
+def test_query_plan_scans_covering_index(conn, name):
+    query, params = COVERING_SCAN_QUERIES[name]
+    plan = query_plan(conn, query, params)
+    assert all(detail.startswith('SCAN') and 'USING COVERING INDEX' in detail for detail in plan), \
+        f"{name} reads the table instead of a covering index: {plan}"
+
+def test_migrate_is_idempotent_and_keeps_data(tmp_path):
+    db_path = str(tmp_path / 'reservations.db')
+    # Table as created by chatbot.py before migrations existed
+    conn = sqlite3.connect(db_path)
+    conn.execute('''CREATE TABLE reservations
+                    (pnr TEXT PRIMARY KEY, name TEXT, service TEXT, route TEXT, passengers INTEGER,
+                     phone TEXT, address_pickup TEXT, address_dropoff TEXT, flight TEXT, pickup_time TEXT,
+                     pickup_date TEXT, vehicle TEXT, total_cost INTEGER, status TEXT)''')
+    conn.execute("INSERT INTO reservations (pnr, name, total_cost, status) VALUES ('KR-ABC123', 'Budi', 180000, 'pending')")
+    conn.commit()
+    conn.close()
+
+    latest = list_migrations(MIGRATIONS_DIR)[-1][0]
+    assert migrate(db_path) == latest
+    assert migrate(db_path) == latest
+
+    conn = sqlite3.connect(db_path)
+    assert get_schema_version(conn) == latest
+    assert conn.execute("SELECT name FROM reservations WHERE pnr = 'KR-ABC123'").fetchone() == ('Budi',)
+    conn.close()
+
+def test_failed_migration_rolls_back(tmp_path):
+    migrations_dir = tmp_path / 'migrations'
+    migrations_dir.mkdir()
+    (migrations_dir / '0001_initial.sql').write_text("CREATE TABLE t (id INTEGER);\n")
+    (migrations_dir / '0002_broken.sql').write_text("CREATE INDEX idx_t ON t(id);\nCREATE INDEX idx_bad ON missing(id);\n")
+    db_path = str(tmp_path / 'test.db')
+
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(db_path, str(migrations_dir))
+
+    conn = sqlite3.connect(db_path)
+    assert get_schema_version(conn) == 1
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'idx_t'").fetchone() is None
+    conn.close()
@@ -0,0 +1,42 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rate_limit import LoadShedder, MemoryBucketStore, SQLiteBucketStore
+
+def drain(store, key, n, now):
+    return [store.consume(key, rate=1.0, burst=3, now=now) for _ in range(n)]
+
+def test_memory_bucket_burst_and_refill():
+    store = MemoryBucketStore()
+    results = drain(store, 'user:a', 4, now=100.0)
+    assert [allowed for allowed, _ in results] == [True, True, True, False]
+    assert results[-1][1] == 1
+    # Other keys have their own bucket
+    assert store.consume('user:b', 1.0, 3, now=100.0)[0]
+    # One token back after a second
+    assert store.consume('user:a', 1.0, 3, now=101.0)[0]
+    assert not store.consume('user:a', 1.0, 3, now=101.0)[0]
+
+def test_memory_bucket_evicts_oldest_key():
+    store = MemoryBucketStore(max_keys=2)
+    for key in ['a', 'b', 'c']:
+        store.consume(key, 1.0, 3, now=0.0)
+    assert list(store._buckets) == ['b', 'c']
+
+def test_sqlite_bucket_is_shared(tmp_path):
+    db_path = str(tmp_path / 'rate_limits.db')
+    first, second = SQLiteBucketStore(db_path), SQLiteBucketStore(db_path)
+    assert first.consume('user:a', 1.0, 2, now=100.0)[0]
+    assert second.consume('user:a', 1.0, 2, now=100.0)[0]
+    allowed, retry_after = first.consume('user:a', 1.0, 2, now=100.0)
+    assert not allowed and retry_after == 1
+    assert second.consume('user:a', 1.0, 2, now=101.5)[0]
+
+def test_load_shedder():
+    shedder = LoadShedder(max_in_flight=2)
+    assert shedder.try_enter() and shedder.try_enter()
+    assert not shedder.try_enter()
+    shedder.exit()
+    assert shedder.try_enter()
@@ -0,0 +1,124 @@
+import sqlite3
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.apply_schema import migrate
+from database.read_pool import ReadOnlyPool, ReplicaRefresher
+
+def insert_reservation(db_path, pnr):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO reservations (pnr, name, service, route, passengers, phone, address_pickup, total_cost, status) "
+                 "VALUES (?, 'Budi', 'reguler', 'malang-juanda', 1, '+6281234567890', 'Jl. Kawi', 180000, 'pending')", (pnr,))
+    conn.commit()
+    conn.close()
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'reservations.db')
+    migrate(path)
+    insert_reservation(path, 'KR-000001')
+    return path
+
+def test_connections_are_read_only(db_path):
+    pool = ReadOnlyPool(db_path, size=1)
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection() as conn:
+            conn.execute("DELETE FROM reservations")
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0] == 1
+    pool.close()
+
+def test_snapshot_is_consistent_and_writers_are_not_blocked(db_path):
+    pool = ReadOnlyPool(db_path, size=1)
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0] == 1
+        # A booking commit goes through while the report read is open...
+        insert_reservation(db_path, 'KR-000002')
+        # ...and the report keeps seeing its original snapshot.
+        assert conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0] == 1
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0] == 2
+    pool.close()
+
+def test_pool_reuses_connections(db_path):
+    pool = ReadOnlyPool(db_path, size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    pool.close()
+
+def test_replica_refresh(db_path, tmp_path):
+    replica_path = str(tmp_path / 'replica.db')
+    pool = ReadOnlyPool(replica_path, size=1)
+    refresher = ReplicaRefresher(db_path, replica_path, interval=3600, pool=pool)
+    refresher.start()
+    try:
+        insert_reservation(db_path, 'KR-000002')
+        with pool.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0] == 1
+        refresher.refresh()
+        with pool.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0] == 2
+    finally:
+        refresher.stop()
+        pool.close()
+
+def test_pool_refuses_database_outside_wal_mode(tmp_path, caplog):
+    path = str(tmp_path / 'rollback.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE reservations (pnr TEXT PRIMARY KEY)")
+    conn.close()
+    strict = ReadOnlyPool(path, size=1, require_wal=True)
+    with pytest.raises(sqlite3.OperationalError, match='journal_mode=delete'):
+        with strict.connection():
+            pass
+    lenient = ReadOnlyPool(path, size=1)
+    with lenient.connection() as conn:
+        conn.execute("SELECT COUNT(*) FROM reservations").fetchone()
+    assert 'not wal' in caplog.text
+    lenient.close()
+
+def test_migrate_enables_wal(db_path):
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    conn.close()
+
+def test_replica_is_copied_once_per_interval(db_path, tmp_path):
+    replica_path = str(tmp_path / 'replica.db')
+    pools = [ReadOnlyPool(replica_path, size=1) for _ in range(2)]
+    first, second = [ReplicaRefresher(db_path, replica_path, interval=3600, pool=pool) for pool in pools]
+    first.refresh(force=False)
+    copied_at = os.stat(replica_path).st_mtime_ns
+    # A second worker finds a fresh replica and does not copy it again
+    second.refresh(force=False)
+    assert os.stat(replica_path).st_mtime_ns == copied_at
+    with pools[1].connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0] == 1
+
+    insert_reservation(db_path, 'KR-000002')
+    first.refresh()
+    # ...but reopens the replica once another worker has replaced it
+    second.reopen_if_replaced()
+    with pools[1].connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0] == 2
+    for pool in pools:
+        pool.close()
+
+def test_failed_reopen_does_not_shrink_pool(db_path, tmp_path):
+    pool = ReadOnlyPool(db_path, size=1, timeout=0.1)
+    with pool.connection():
+        pass
+    pool.invalidate()
+    os.rename(db_path, db_path + '.moved')
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection():
+            pass
+    os.rename(db_path + '.moved', db_path)
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0] == 1
+    pool.close()
@@ -0,0 +1,87 @@
+import csv
+import io
+import sqlite3
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from reservations_export import EXPORT_COLUMNS, iter_reservation_chunks, stream_csv, stream_parquet
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'reservations.db')
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE reservations
+                    (pnr TEXT PRIMARY KEY, name TEXT, service TEXT, route TEXT, passengers INTEGER,
+                     phone TEXT, address_pickup TEXT, address_dropoff TEXT, flight TEXT, pickup_time TEXT,
+                     pickup_date TEXT, vehicle TEXT, total_cost INTEGER, status TEXT)''')
+    rows = [(f'KR-{i:06d}', 'Budi Santoso', 'reguler', 'malang-juanda', 1, '+6281234567890',
+             'Jl. Kawi No. 10', None, 'GA123', '07:00', f'2025-06-{i % 28 + 1:02d}', '', 180000,
+             'confirmed' if i % 2 else 'pending') for i in range(25)]
+    conn.executemany('INSERT INTO reservations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    conn.commit()
+    conn.close()
+    return path
+
+def test_chunks_respect_chunk_size(db_path):
+    sizes = [len(rows) for rows in iter_reservation_chunks(db_path, chunk_size=10)]
+    assert sizes == [10, 10, 5]
+
+def test_filters(db_path):
+    rows = [r for chunk in iter_reservation_chunks(db_path, start_date='2025-06-05', end_date='2025-06-10',
+                                                   statuses=['confirmed']) for r in chunk]
+    assert rows
+    assert all(r[-1] == 'confirmed' and '2025-06-05' <= r[10] <= '2025-06-10' for r in rows)
+
+def test_stream_csv(db_path):
+    blocks = list(stream_csv(iter_reservation_chunks(db_path, chunk_size=10)))
+    assert len(blocks) == 3
+    records = list(csv.reader(io.StringIO(b''.join(blocks).decode('utf-8'))))
+    assert records[0] == EXPORT_COLUMNS
+    assert len(records) == 26
+    assert records[1][0] == 'KR-000000'
+
+def test_stream_csv_empty_export_has_header(db_path):
+    blocks = list(stream_csv(iter_reservation_chunks(db_path, statuses=['cancelled'])))
+    assert b''.join(blocks).decode('utf-8').strip() == ','.join(EXPORT_COLUMNS)
+
+@pytest.mark.parametrize('journal_mode', ['wal', 'delete'])
+def test_export_does_not_block_writers(db_path, journal_mode):
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    conn.close()
+    chunks = iter(iter_reservation_chunks(db_path, chunk_size=10))
+    first = next(chunks)
+    # A booking commit while the download is paused between chunks
+    writer = sqlite3.connect(db_path, timeout=0)
+    writer.execute("INSERT INTO reservations (pnr, status) VALUES ('KR-NEW001', 'pending')")
+    writer.commit()
+    writer.close()
+    rows = first + [r for chunk in chunks for r in chunk]
+    assert len(rows) == 25
+    assert 'KR-NEW001' not in {r[0] for r in rows}
+
+def test_missing_database_fails_before_streaming(tmp_path):
+    with pytest.raises(sqlite3.OperationalError):
+        iter_reservation_chunks(str(tmp_path / 'missing.db'))
+
+def test_close_before_iterating_removes_snapshot(db_path, tmp_path):
+    chunks = iter_reservation_chunks(db_path)
+    snapshot_path = chunks._snapshot_path
+    assert snapshot_path is not None and os.path.exists(snapshot_path)
+    chunks.close()
+    assert not os.path.exists(snapshot_path)
+
+def test_stream_parquet(db_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    data = b''.join(stream_parquet(iter_reservation_chunks(db_path, chunk_size=10)))
+    parquet_file = pq.ParquetFile(io.BytesIO(data))
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read()
+    assert table.column_names == EXPORT_COLUMNS
+    assert table.num_rows == 25
+    assert table.column('pnr')[0].as_py() == 'KR-000000'
+    assert table.column('total_cost').to_pylist() == [180000] * 25
@@ -0,0 +1,79 @@
+import pickle
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rf_model import FEATURE_NAMES, ModelCache, build_features
+
+class ConstantModel:
+    def __init__(self, value):
+        self.value = value
+
+    def predict_proba(self, features):
+        import numpy as np
+        return np.column_stack([1 - np.full(len(features), self.value), np.full(len(features), self.value)])
+
+def column(features, name):
+    return features[:, FEATURE_NAMES.index(name)]
+
+def test_build_features():
+    pytest.importorskip('numpy')
+    features = build_features([
+        {'route': 'Malang-Juanda', 'service': 'charter drop', 'passengers': 3,
+         'pickup_time': '07:30', 'pickup_date': '2025-06-20'},
+        {'route': 'unknown', 'service': 'reguler', 'passengers': None,
+         'pickup_time': None, 'pickup_date': 'not a date'},
+    ])
+    assert features.shape == (2, len(FEATURE_NAMES))
+    assert column(features, 'route=malang-juanda').tolist() == [1, 0]
+    assert column(features, 'service=charter_drop').tolist() == [1, 0]
+    assert column(features, 'passengers').tolist() == [3, 0]
+    assert column(features, 'pickup_hour').tolist() == [7, -1]
+    # 2025-06-20 is a Friday
+    assert column(features, 'pickup_weekday').tolist() == [4, -1]
+    assert column(features, 'pickup_month').tolist() == [6, -1]
+    assert column(features, 'pickup_day').tolist() == [20, -1]
+
+def test_model_cache_loads_once_and_hot_reloads(tmp_path):
+    pytest.importorskip('numpy')
+    path = tmp_path / 'model.pkl'
+    path.write_bytes(pickle.dumps(ConstantModel(0.25)))
+    cache = ModelCache(str(path), hot_reload=True, check_interval=0)
+    features = build_features([{'route': 'malang-juanda'}] * 3)
+    assert cache.predict(features).tolist() == [0.25] * 3
+    assert cache.get() is cache.get()
+
+    path.write_bytes(pickle.dumps(ConstantModel(0.75)))
+    os.utime(path, (0, 0))
+    assert cache.predict(features).tolist() == [0.75] * 3
+
+def test_model_cache_without_hot_reload_keeps_model(tmp_path):
+    path = tmp_path / 'model.pkl'
+    path.write_bytes(pickle.dumps(ConstantModel(0.25)))
+    cache = ModelCache(str(path))
+    first = cache.get()
+    path.write_bytes(pickle.dumps(ConstantModel(0.75)))
+    os.utime(path, (0, 0))
+    assert cache.get() is first
+
+def test_model_cache_keeps_model_when_reload_fails(tmp_path):
+    path = tmp_path / 'model.pkl'
+    path.write_bytes(pickle.dumps(ConstantModel(0.25)))
+    cache = ModelCache(str(path), hot_reload=True, check_interval=0)
+    first = cache.get()
+    # A half-written model file replaces the good one
+    path.write_bytes(b'not a pickle')
+    os.utime(path, (0, 0))
+    assert cache.get() is first
+    path.write_bytes(pickle.dumps(ConstantModel(0.75)))
+    os.utime(path, (1, 1))
+    assert cache.get().value == 0.75
+
+def test_model_cache_without_model_raises_load_error(tmp_path):
+    path = tmp_path / 'model.pkl'
+    path.write_bytes(b'not a pickle')
+    with pytest.raises(Exception):
+        ModelCache(str(path)).get()
@@ -0,0 +1,50 @@
+import gzip
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.queries import reservation_columns, reservation_records
+from serialization import choose_encoding, dumps, encode_response
+
+ROWS = [
+    ('KR-ABC123', 'Budi Santoso', 'reguler', 'malang-juanda', 3, 230000, 'pending',
+     '2025-06-20', '07:00', 'Jl. Kawi No. 10', None),
+    ('KR-DEF456', 'Siti Aminah', 'charter_drop', 'juanda', 1, 395000, 'confirmed',
+     '2025-06-21', '09:30', 'Jl. Ijen No. 1', 'Jl. Sudirman No. 5'),
+]
+
+def test_dumps_matches_stdlib():
+    payload = reservation_records(ROWS)
+    assert json.loads(dumps(payload)) == payload
+
+def test_columnar_matches_records():
+    records = reservation_records(ROWS)
+    columnar = reservation_columns(ROWS)
+    assert columnar['length'] == 2
+    for i, record in enumerate(records):
+        for column in columnar['columns']:
+            assert columnar['data'][column][i] == record[column]
+    assert records[1]['route_origin'] == 'juanda' and records[1]['route_destination'] == ''
+
+def test_columnar_empty():
+    assert reservation_columns([])['data']['reservation_id'] == []
+
+def test_choose_encoding():
+    assert choose_encoding(None) is None
+    assert choose_encoding('identity') is None
+    assert choose_encoding('gzip, deflate') == 'gzip'
+    assert choose_encoding('gzip;q=0') is None
+    assert choose_encoding('*') in ('br', 'gzip')
+
+def test_encode_response_threshold():
+    small_body, small_headers = encode_response({'ok': True}, 'gzip')
+    assert 'Content-Encoding' not in small_headers
+    assert json.loads(small_body) == {'ok': True}
+
+    payload = reservation_records(ROWS * 50)
+    body, headers = encode_response(payload, 'gzip')
+    assert headers['Content-Encoding'] == 'gzip'
+    assert headers['Vary'] == 'Accept-Encoding'
+    assert json.loads(gzip.decompress(body)) == payload